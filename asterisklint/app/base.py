@@ -13,6 +13,9 @@
 #
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
+import re
+from functools import lru_cache
+
 from . import (
     E_APP_ARG_BADOPT, E_APP_ARG_DUPEOPT, E_APP_MISSING,
     E_APP_ARG_FEW, E_APP_ARG_MANY, E_APP_ARG_PIPEDELIM,
@@ -27,6 +30,15 @@ from ..variable import Var, strjoin, variable_check_balance
 # one.
 
 
+@lru_cache(maxsize=32)
+def get_plain_args_re(delimiter):
+    """
+    Return a regex that finds the delimiters, brackets and parentheses,
+    for AppBase._separate_plain_args.
+    """
+    return re.compile(r'[\[\]()]|' + re.escape(delimiter))
+
+
 class AppArg(object):
     def __init__(self, name):
         self.name = name
@@ -93,15 +105,62 @@ class AppBase(object):
         #
         # TODO: we should separate args using a more sensible approach as
         # well, so we can warn on inconsistencies.
+        if (isinstance(data, str) and '"' not in data and
+                '\\' not in data and delimiter not in '[]()'):
+            # Most args: no variables, no quotes and no backslashes.
+            return AppBase._separate_plain_args(data, delimiter)
+        return AppBase._separate_args(
+            data, delimiter, remove_quotes_backslashes)
+
+    @staticmethod
+    def _separate_plain_args(data, delimiter):
+        # Only the brackets and parentheses need to be taken into
+        # account; and often there are none.
+        if '[' not in data and '(' not in data:
+            return data.split(delimiter)
+
+        brackets = 0
+        parens = 0
+
+        ret = []
+        start = 0
+        for match in get_plain_args_re(delimiter).finditer(data):
+            char = match.group()
+            if char == '[':
+                brackets += 1
+            elif char == ']':
+                if brackets:
+                    brackets -= 1
+            elif char == '(':
+                parens += 1
+            elif char == ')':
+                if parens:
+                    parens -= 1
+            elif not (brackets or parens):
+                ret.append(data[start:match.start()])
+                start = match.end()
+
+        # Append leftover arg.
+        ret.append(data[start:])
+        return ret
+
+    @staticmethod
+    def _separate_args(data, delimiter, remove_quotes_backslashes):
         brackets = 0
         parens = 0
         quotes = False
         skipnext = False
 
+        if isinstance(data, Var):
+            segments = data.get_segments()
+        else:
+            segments = [data]
+
+        # Walk over the strings between the variables, collecting the
+        # pieces of each arg.
         ret = [[]]
-        start = 0
-        for i, char in enumerate(data):
-            if isinstance(char, Var):
+        for segment in segments:
+            if isinstance(segment, Var):
                 # It's possible that we're looping over a Var variable.
                 # In that case we'll have to assume the Var itself
                 # contains no separators that we might be interested in.
@@ -111,49 +170,50 @@ class AppBase(object):
                 # But we expect you to do this:
                 # ``Set(mailbox=mailbox@context)``
                 # ``VoiceMail(${mailbox},s)``
-                # Skip it?
-                # #ret[-1].extend(data[start:i])  # skip char
-                # #start = i + 1
                 # Don't skip it, we want the returned value.
-                pass
-            elif skipnext:
-                skipnext = False
-            elif char == '[':
-                brackets += 1
-            elif char == ']':
-                if brackets:
-                    brackets -= 1
-            elif char == '(':
-                parens += 1
-            elif char == ')':
-                if parens:
-                    parens -= 1
-            elif char == '"' and delimiter != '"':
-                quotes = not quotes
-                if remove_quotes_backslashes:
-                    ret[-1].extend(data[start:i])
-                    start = i + 1
-            elif char == '\\':
-                if remove_quotes_backslashes:
-                    ret[-1].extend(data[start:i])
+                ret[-1].append(segment)
+                continue
+
+            start = 0
+            for i, char in enumerate(segment):
+                if skipnext:
+                    skipnext = False
+                elif char == '[':
+                    brackets += 1
+                elif char == ']':
+                    if brackets:
+                        brackets -= 1
+                elif char == '(':
+                    parens += 1
+                elif char == ')':
+                    if parens:
+                        parens -= 1
+                elif char == '"' and delimiter != '"':
+                    quotes = not quotes
+                    if remove_quotes_backslashes:
+                        ret[-1].append(segment[start:i])
+                        start = i + 1
+                elif char == '\\':
+                    if remove_quotes_backslashes:
+                        ret[-1].append(segment[start:i])
+                        start = i + 1
+                    skipnext = True
+                elif char == delimiter and not (brackets or parens or quotes):
+                    ret[-1].append(segment[start:i])
                     start = i + 1
-                skipnext = True
-            elif char == delimiter and not (brackets or parens or quotes):
-                ret[-1].extend(data[start:i])
-                start = i + 1
-                ret.append([])  # start on next arg
+                    ret.append([])  # start on next arg
 
-        # Append leftover args.
-        ret[-1].extend(data[start:])
+            # Append leftover piece.
+            ret[-1].append(segment[start:])
 
         # Squash args.
         squashed = []
-        for letters in ret:
-            letters = list(strjoin(letters))  # join sequences of strings
-            if len(letters) == 1:
-                squashed.append(letters[0])
+        for pieces in ret:
+            pieces = list(strjoin(pieces))  # join sequences of strings
+            if len(pieces) == 1:
+                squashed.append(pieces[0])
             else:
-                squashed.append(Var.join(letters))
+                squashed.append(Var.join(pieces))
 
         return squashed
 
@@ -13,12 +13,14 @@
 #
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
+from collections import OrderedDict, defaultdict
 from importlib import import_module
+from sys import intern
 
 from .app import E_APP_MISSING
 from .cls import Singleton
-from .defines import ErrorDef, WarningDef
-from .varfun import VarLoader, VarParseError
+from .defines import ErrorDef, MessageDefManager, WarningDef
+from .varfun import FuncLoader, VarLoader, VarParseError
 from .version import AsteriskVersion
 
 
@@ -40,6 +42,7 @@ class AppLoader(metaclass=Singleton):
     def __init__(self):
         self._lower_apps = {}
         self._used_apps = set()
+        self.data_cache = AppDataCache()
 
         self.load_all()
 
@@ -84,6 +87,116 @@ class AppLoader(metaclass=Singleton):
         self._lower_apps[lower_app] = app
 
 
+class AppDataCache(object):
+    """
+    A bounded LRU cache of parsed application data, keyed by (app name
+    as written, raw data). Generated dialplans repeat the same app
+    arguments over and over; for those, parsing once is enough.
+
+    An entry holds everything the parse produced: the parsed data, the
+    jump destinations, the messages (class and format arguments) and
+    the variables, functions and (nested) apps used. A hit raises the
+    messages again for the new position, so the outcome is the same as
+    that of a parse.
+    """
+    def __init__(self, size=4096):
+        self.size = size
+        self.hits = self.misses = 0
+        self._entries = OrderedDict()
+        self._generation = None  # of the FuncLoader
+
+    def clear(self):
+        self._entries.clear()
+
+    def parse(self, app, handler):
+        """
+        Do app.parse_data(handler), or replay it from the cache.
+        """
+        # The parse depends on the functions known; func_odbc adds
+        # some.
+        funcloader = FuncLoader()
+        if self._generation != funcloader.generation:
+            self._entries.clear()
+            self._generation = funcloader.generation
+
+        # The messages name the app as written, so key on that, not on
+        # the handler.
+        key = (app.app, app.data)
+        try:
+            entry = self._entries[key]
+        except KeyError:
+            self.misses += 1
+            entry = self._record(app, handler, funcloader)
+            if entry is not None:
+                self._entries[key] = entry
+                if len(self._entries) > self.size:
+                    self._entries.popitem(last=False)
+        else:
+            self.hits += 1
+            self._entries.move_to_end(key)
+            self._replay(app, entry, funcloader)
+
+    def _record(self, app, handler, funcloader):
+        # Parse with empty collections, so we can see what was added.
+        # Nested apps (ExecIf) are looked up during the parse as well.
+        apploader, varloader = AppLoader(), VarLoader()
+        collected = MessageDefManager.collected
+        variables, used_funcs = varloader._variables, funcloader._used_funcs
+        used_apps = apploader._used_apps
+        MessageDefManager.collected = messages = []
+        varloader._variables = new_variables = defaultdict(list)
+        funcloader._used_funcs = new_used_funcs = set()
+        apploader._used_apps = new_used_apps = set()
+        try:
+            app.parse_data(handler)
+        finally:
+            MessageDefManager.collected = collected
+            varloader._variables = variables
+            funcloader._used_funcs = used_funcs
+            apploader._used_apps = used_apps
+            for varname, wheres in new_variables.items():
+                variables[varname].extend(wheres)
+            used_funcs.update(new_used_funcs)
+            used_apps.update(new_used_apps)
+            # The callbacks were called already, when they were raised.
+            for message in messages:
+                MessageDefManager.on_message(message)
+
+        # Only store what we can replay at another position.
+        where = app.where
+        if any(message.where is not where or message.previous
+               for message in messages):
+            return None
+        if any(i is not where
+               for wheres in new_variables.values() for i in wheres):
+            return None
+
+        return (
+            app.data, tuple(app.jump_destinations),
+            tuple((message.__class__, message.fmtkwargs)
+                  for message in messages),
+            tuple((varname, len(wheres))
+                  for varname, wheres in new_variables.items()),
+            frozenset(new_used_funcs), frozenset(new_used_apps))
+
+    def _replay(self, app, entry, funcloader):
+        (data, jump_destinations, messages, variables, used_funcs,
+         used_apps) = entry
+        where = app.where
+        app.data = data
+        app.jump_destinations.extend(jump_destinations)
+        for class_, fmtkwargs in messages:
+            class_(where, **fmtkwargs)
+        all_variables = VarLoader()._variables
+        for varname, count in variables:
+            all_variables[varname].extend([where] * count)
+        funcloader._used_funcs.update(used_funcs)
+        # Look them up again: that aliases the unknown apps as well.
+        apploader = AppLoader()
+        for lower_app in used_apps:
+            apploader.get(lower_app)
+
+
 class App(object):
     # App heeft weer z'n eigen parsers en subparsers. Hiermee moeten we ook
     # op kunnen zoeken welke modules er nodig zijn (w00t). Deze komt ook als
@@ -102,6 +215,9 @@ class App(object):
     # SPRINTF() voor >= 1.4 => behaviour Y
     #
     # Hoe pakken we dan app_compat settings voor Set? Hm.
+    __slots__ = ('raw', 'where', 'jump_destinations', 'app', 'app_lower',
+                 'data')
+
     def __init__(self, app, where):
         self.raw = app
         self.where = where
@@ -110,6 +226,12 @@ class App(object):
         # Attempt to parse the app + data.
         self.parse()
 
+        # Most apps don't jump; don't keep an empty list around for
+        # every one of them. (The DialplanContext drops the others
+        # after collecting them.)
+        if not self.jump_destinations:
+            self.jump_destinations = ()
+
     def parse(self):
         """
         Parse self.raw into an App and data. Recursively replaces the
@@ -126,9 +248,15 @@ class App(object):
 
         # Find the handler from the registered handlers. If there is no
         # custom handler, we may already raise a message here.
-        app = AppLoader().get(self.app_lower)
+        apploader = AppLoader()
+        app = apploader.get(self.app_lower)
         app.check_availability(self.app, where=self.where)
 
+        # Generated dialplans repeat the same data over and over; the
+        # cache does parse_data() only once for those.
+        apploader.data_cache.parse(self, app)
+
+    def parse_data(self, app):
         # Pass the data through a handler -- which also handles
         # functions -- first:
         self.data = self.parse_inner(self.data)
@@ -170,9 +298,10 @@ class App(object):
         if data.startswith('(') and data.endswith(')'):
             data = data[1:-1]
 
-        # Set it and try to find a handler for it.
-        self.app = app
-        self.app_lower = app.lower()
+        # Set it and try to find a handler for it. The app names are
+        # repeated over and over, so we intern them.
+        self.app = intern(app)
+        self.app_lower = intern(app.lower())
         self.data = data
 
         # Leading whitespace is frowned upon but allowed. Trailing
@@ -182,8 +311,8 @@ class App(object):
             return False
         if self.app.lstrip() != self.app:
             W_APP_WSH(self.where, app=self.app)
-            self.app = self.app.lstrip()
-            self.app_lower = self.app.lower()
+            self.app = intern(self.app.lstrip())
+            self.app_lower = intern(self.app.lower())
         # Quick check that the app doesn't exist.
         if not self.app:
             E_APP_MISSING(self.where, app='(none)')
@@ -0,0 +1,93 @@
+# AsteriskLint -- an Asterisk PBX config syntax checker
+# Copyright (C) 2015-2022  Walter Doekes, OSSO B.V.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+from functools import partial
+from multiprocessing import get_all_start_methods, get_context
+
+from . import FileDialplanParser
+from .mainutil import load_func_odbc_functions
+from .session import LintSession
+
+EXIT_OK = 0
+EXIT_ISSUES = 1
+EXIT_ERROR = 2
+
+
+def lint_dialplan(filename, func_odbc=None, parse_cache=None):
+    """
+    Lint the dialplan in filename, and its func_odbc.conf (see
+    load_func_odbc_functions), in a LintSession of its own. Returns a
+    record that can be written as JSON::
+
+        {'dialplan': 'tenant1/extensions.conf',
+         'status': 'issues',  # or 'ok' or 'error'
+         'exit': 1,  # EXIT_ISSUES (or EXIT_OK or EXIT_ERROR)
+         'messages': [{'file': 'tenant1/extensions.conf', 'line': 3,
+                       'class': 'E_DP_GOTO_NOCONTEXT', 'desc': '...'}]}
+
+    Muted messages (ALINT_IGNORE) are left out. If the dialplan could
+    not be linted, there is an 'error' as well.
+    """
+    record = {'dialplan': filename}
+    with LintSession() as session:
+        try:
+            load_func_odbc_functions(func_odbc, filename)
+            parser = FileDialplanParser()
+            if parse_cache:
+                parser.parse_cache = parse_cache
+            parser.include(filename)
+            dialplan = next(iter(parser))
+            dialplan.walk_jump_destinations()
+            del dialplan
+        except Exception as e:
+            # One broken dialplan should not stop the rest.
+            record['error'] = '{}: {}'.format(e.__class__.__name__, e)
+
+    record['messages'] = [
+        {'file': msg.where.filename, 'line': msg.where.lineno,
+         'class': msg.__class__.__name__,
+         'desc': msg.message.format(**msg.fmtkwargs)}
+        for msg in session.messages if not msg.muted]
+
+    if 'error' in record:
+        record['status'], record['exit'] = 'error', EXIT_ERROR
+    elif record['messages']:
+        record['status'], record['exit'] = 'issues', EXIT_ISSUES
+    else:
+        record['status'], record['exit'] = 'ok', EXIT_OK
+    return record
+
+
+def lint_dialplans(filenames, jobs=1, func_odbc=None, parse_cache=None):
+    """
+    Lint the dialplans in filenames, using jobs forked worker processes
+    if jobs > 1. Yields the lint_dialplan() records in filenames order.
+
+    The applications and functions are loaded before forking, so the
+    workers share them and load nothing per dialplan.
+    """
+    LintSession.preload()
+    worker = partial(
+        lint_dialplan, func_odbc=func_odbc, parse_cache=parse_cache)
+
+    if (jobs > 1 and len(filenames) > 1 and
+            'fork' in get_all_start_methods()):
+        with get_context('fork').Pool(jobs) as pool:
+            # A dialplan per task; they can take very different times.
+            for record in pool.imap(worker, filenames):
+                yield record
+    else:
+        for filename in filenames:
+            yield worker(filename)
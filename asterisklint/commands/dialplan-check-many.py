@@ -0,0 +1,128 @@
+# AsteriskLint -- an Asterisk PBX config syntax checker
+# Copyright (C) 2015-2022  Walter Doekes, OSSO B.V.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+Do sanity checks on many dialplans using a pool of processes. Takes
+'extensions.conf' paths or globs as arguments. Writes a JSON line per
+dialplan.
+"""
+import argparse
+import json
+import os
+import sys
+from glob import glob
+
+from asterisklint.batch import lint_dialplans
+from asterisklint.filecache import ParseCache
+from asterisklint.mainutil import MainBase, UniqueStore
+
+
+class Main(MainBase):
+    def create_argparser(self, argparser_class):
+        parser = argparser_class(
+            description=(
+                'Do sanity checks on many dialplans, using a pool of worker '
+                'processes. Writes a JSON object per dialplan, with its '
+                'issues, on a line of its own. Suppress comma separated '
+                'error classes through the ALINT_IGNORE environment variable. '
+                'Returns 1 if any issue was reported, 2 if any dialplan '
+                'could not be checked.'))
+        parser.add_argument(
+            'dialplans', metavar='EXTENSIONS_CONF', nargs='*',
+            help="path to an extensions.conf, or a glob pattern like "
+                 "'tenants/*/extensions.conf'")
+        parser.add_argument(
+            '--manifest', metavar='MANIFEST', action=UniqueStore,
+            help="read paths to extensions.conf files from MANIFEST, one "
+                 "per line; use - for stdin")
+        parser.add_argument(
+            '--func-odbc', metavar='FUNC_ODBC_CONF', action=UniqueStore,
+            help="path to func_odbc.conf for all dialplans; by default the "
+                 "one in the same dir as each extensions.conf is read, if "
+                 "found; set empty to disable")
+        parser.add_argument(
+            '--jobs', metavar='N', type=int, default=os.cpu_count() or 1,
+            help="check N dialplans at a time (default: number of CPUs)")
+        parser.add_argument(
+            '--output', metavar='JSONL', default='-',
+            help="write the results to JSONL instead of stdout")
+        parser.add_argument(
+            '--parse-cache', metavar='DIR',
+            help="keep the parsed files in DIR, so unchanged (shared) "
+                 "files need not be parsed again")
+        return parser
+
+    def parse_args(self, args):
+        parser = self.create_argparser(argparse.ArgumentParser)
+        args = parser.parse_args(args)
+        if not args.dialplans and not args.manifest:
+            parser.error('no dialplans or manifest given')
+        return args
+
+    def handle_args(self, args):
+        filenames = self.get_filenames(args.dialplans, args.manifest)
+        parse_cache = args.parse_cache and ParseCache(args.parse_cache)
+
+        if args.output == '-':
+            self.write_records(
+                sys.stdout, filenames, args.jobs, args.func_odbc,
+                parse_cache)
+        else:
+            with open(args.output, 'w') as fp:
+                self.write_records(
+                    fp, filenames, args.jobs, args.func_odbc, parse_cache)
+        return self.report(filenames)
+
+    def get_filenames(self, patterns, manifest):
+        ret = []
+        for pattern in patterns:
+            # Keep non-matching patterns; they will show up as errors.
+            ret.extend(sorted(glob(pattern, recursive=True)) or [pattern])
+
+        if manifest:
+            if manifest == '-':
+                ret.extend(self.read_manifest(sys.stdin))
+            else:
+                with open(manifest) as fp:
+                    ret.extend(self.read_manifest(fp))
+        return ret
+
+    def read_manifest(self, fp):
+        for line in fp:
+            line = line.strip()
+            if line and not line.startswith('#'):
+                yield line
+
+    def write_records(self, fp, filenames, jobs, func_odbc, parse_cache):
+        self.counts = {}  # {status: count}
+        self.exit = 0
+        for record in lint_dialplans(
+                filenames, jobs=jobs, func_odbc=func_odbc,
+                parse_cache=parse_cache):
+            fp.write(json.dumps(record, sort_keys=True) + '\n')
+            fp.flush()
+            self.counts[record['status']] = (
+                self.counts.get(record['status'], 0) + 1)
+            self.exit = max(self.exit, record['exit'])
+
+    def report(self, filenames):
+        print('{} dialplans: {} ok, {} with issues, {} errors'.format(
+            len(filenames), self.counts.get('ok', 0),
+            self.counts.get('issues', 0), self.counts.get('error', 0)),
+            file=sys.stderr)
+        return self.exit or None
+
+
+main = Main()
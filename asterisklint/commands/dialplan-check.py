@@ -17,10 +17,15 @@
 Do sanity checks on dialplan. Takes 'extensions.conf' as argument.
 Suppress errors using ALINT_IGNORE env.
 """
+import sys
+
 from asterisklint import FileDialplanParser
 from asterisklint.defines import MessageDefManager
+from asterisklint.filecache import ParseCache
+from asterisklint.includegraph import IncludeGraph
 from asterisklint.mainutil import (
     MainBase, UniqueStore, load_func_odbc_functions)
+from asterisklint.watch import DialplanWatcher
 
 
 class Main(MainBase):
@@ -39,23 +44,79 @@ class Main(MainBase):
             help="path to func_odbc.conf, will be read automatically if found "
                  "in same the same dir as extensions.conf; "
                  "set empty to disable")
+        parser.add_argument(
+            '--jobs', metavar='N', type=int, default=1,
+            help="check the jump destinations using N processes")
+        parser.add_argument(
+            '--parse-cache', metavar='DIR',
+            help="keep the parsed files in DIR, so unchanged (#include'd) "
+                 "files need not be parsed again")
+        parser.add_argument(
+            '--watch', action='store_true',
+            help="keep running, and check the dialplan again when one of "
+                 "its files changes; only the changed contexts are checked "
+                 "if possible")
+        parser.add_argument(
+            '--include-graph', metavar='GRAPH_JSON',
+            help="read the graph of #include'd files from GRAPH_JSON (if it "
+                 "exists), and write it back including this dialplan")
+        parser.add_argument(
+            '--changed', metavar='FILE', action='append',
+            help="only check the dialplan if the --include-graph says it "
+                 "(recursively) includes FILE; repeat for more changed "
+                 "files; dialplans not in the graph are always checked")
         return parser
 
     def handle_args(self, args):
+        include_graph = (
+            args.include_graph and IncludeGraph.load_file(args.include_graph))
+        if (args.changed and include_graph and
+                include_graph.has_root(args.dialplan) and
+                not include_graph.get_roots(args.changed, [args.dialplan])):
+            # Nothing changed for us.
+            return
+
         # Load func_odbc functions if requested.
-        load_func_odbc_functions(args.func_odbc, args.dialplan)
+        func_odbc = load_func_odbc_functions(args.func_odbc, args.dialplan)
+
+        parse_cache = args.parse_cache and ParseCache(args.parse_cache)
+        if args.watch:
+            return self.watch(args, parse_cache)
 
         parser = FileDialplanParser()
+        if parse_cache:
+            parser.parse_cache = parse_cache
         parser.include(args.dialplan)
         dialplan = next(iter(parser))
-        dialplan.walk_jump_destinations()
+        dialplan.walk_jump_destinations(jobs=args.jobs)
         del dialplan
 
+        if include_graph is not None:
+            if func_odbc:
+                # Not an #include, but we depend on it all the same.
+                parser.include_graph.add(args.dialplan, func_odbc)
+            include_graph.update(parser.include_graph)
+            include_graph.dump_file(args.include_graph)
+
         # MessageDefManager.raised is a dict of messages ordered by message
         # type. All message types share the same muted flag, so we need only
         # examine the first.
         if any(not i[0].muted for i in MessageDefManager.raised.values()):
             return 1
 
+    def watch(self, args, parse_cache):
+        watcher = DialplanWatcher(
+            args.dialplan, jobs=args.jobs, parse_cache=parse_cache)
+        watcher.load()
+        try:
+            watcher.watch(on_change=self.on_change)
+        except KeyboardInterrupt:
+            pass
+
+    def on_change(self, filename):
+        # Forget the old messages, we're only reporting the new ones.
+        MessageDefManager.reset()
+        print('-- {} changed'.format(filename), file=sys.stderr)
+
 
 main = Main()
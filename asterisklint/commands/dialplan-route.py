@@ -0,0 +1,91 @@
+# AsteriskLint -- an Asterisk PBX config syntax checker
+# Copyright (C) 2015-2022  Walter Doekes, OSSO B.V.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+Show which extension handles each of the dialed numbers. Takes
+'extensions.conf', a context and a file with numbers as arguments.
+"""
+import sys
+from itertools import islice
+
+from asterisklint import FileDialplanParser
+from asterisklint.defines import MessageDefManager
+from asterisklint.mainutil import MainBase
+
+
+class Main(MainBase):
+    # Match this many numbers at once.
+    batch_size = 65536
+
+    def create_argparser(self, argparser_class):
+        parser = argparser_class(
+            description=(
+                'Show which extension handles each of the dialed numbers, '
+                'like Asterisk would when the call enters the context at '
+                'priority 1. Includes and the i-extension are followed. '
+                'Outputs the number, the extension and its location, tab '
+                'separated. Returns 1 if any number was not routed.'))
+        parser.add_argument(
+            'dialplan', metavar='EXTENSIONS_CONF',
+            help='path to extensions.conf')
+        parser.add_argument(
+            'context', metavar='CONTEXT',
+            help='the context the numbers are dialed in')
+        parser.add_argument(
+            'numbers', metavar='NUMBERS_FILE', nargs='?', default='-',
+            help='file with one number per line; defaults to stdin')
+        return parser
+
+    def handle_args(self, args):
+        MessageDefManager.muted = True  # no messages to stderr
+        parser = FileDialplanParser()
+        parser.include(args.dialplan)
+        dialplan = next(iter(parser))
+
+        try:
+            context = dialplan.get_context(args.context)
+        except KeyError:
+            print('context {!r} not found'.format(args.context),
+                  file=sys.stderr)
+            return 1
+
+        if args.numbers == '-':
+            ret = self.route(context, sys.stdin)
+        else:
+            with open(args.numbers) as numbers:
+                ret = self.route(context, numbers)
+        return ret
+
+    def route(self, context, lines):
+        ret = 0
+        numbers = (i.strip() for i in lines)
+        numbers = (i for i in numbers if i)
+        while True:
+            batch = list(islice(numbers, self.batch_size))
+            if not batch:
+                break
+            found = context.match_many(batch, 1)
+            for number, extension in zip(batch, found):
+                if extension:
+                    print('{}\t{},{}\t{}'.format(
+                        number, extension.pattern.raw,
+                        extension.prio_with_label, extension.where))
+                else:
+                    print('{}\t-\t-'.format(number))
+                    ret = 1
+        return ret
+
+
+main = Main()
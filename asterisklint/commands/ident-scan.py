@@ -20,9 +20,8 @@ Report similarly named contexts, labels and variables. Takes
 from collections import defaultdict
 
 from asterisklint import FileDialplanParser
-from asterisklint.defines import MessageDefManager
-from asterisklint.varfun import VarLoader
 from asterisklint.mainutil import MainBase
+from asterisklint.session import LintSession
 
 try:
     import editdistance  # https://pypi.python.org/pypi/editdistance
@@ -47,12 +46,10 @@ class Main(MainBase):
         return parser
 
     def handle_args(self, args):
-        MessageDefManager.muted = True
-
-        loader = VarLoader()
-        parser = FileDialplanParser()
-        parser.include(args.dialplan)
-        dialplan = next(iter(parser))
+        with LintSession() as session:
+            parser = FileDialplanParser()
+            parser.include(args.dialplan)
+            dialplan = next(iter(parser))
 
         contexts_by_name = list(sorted(
             (context.name for context in dialplan.contexts),
@@ -60,9 +57,8 @@ class Main(MainBase):
         # TODO: dialplan.all_labels is not a public interface..
         labels_by_name = list(sorted(
             dialplan.all_labels, key=(lambda x: x.lower())))
-        # TODO: loader._variables is *not* a public interface..
         varlist_by_name = list(sorted(
-            loader._variables.items(), key=(lambda x: x[0].lower())))
+            session.variables.items(), key=(lambda x: x[0].lower())))
 
         if args.verbose:
             self.print_contexts(contexts_by_name)
@@ -82,50 +82,60 @@ class ConfigParser(object):
     # TODO: look at: main/config.c: process_text_line()
     # it will show odd escaping, and multiline stuff
 
-    regexes = (
-        # [context](template1,template2)
-        (re.compile(r'^(\s*)\[([^]]*)\]\s*\(([^)\+])\)$'),
-         (lambda comment, where, match: Context(
-             name=match.groups()[1], templates=match.groups()[2],
-             comment=comment, bolspace=match.groups()[0], where=where))),
-        # [context]
-        (re.compile(r'^(\s*)\[([^]]*)\]$'),
-         (lambda comment, where, match: Context(
-             name=match.groups()[1], templates='',
-             comment=comment, bolspace=match.groups()[0], where=where))),
-        # object => value
-        (re.compile(r'^([^=]*?)(\s*=>\s*)(.*)$'),
-         (lambda comment, where, match: Varset(
-             variable=match.groups()[0], value=match.groups()[2],
-             separator=match.groups()[1], comment=comment, where=where))),
-        # variable = value
-        (re.compile(r'^([^=]*?)(\s*=\s*)(.*)$'),
-         (lambda comment, where, match: Varset(
-             variable=match.groups()[0], value=match.groups()[2],
-             separator=match.groups()[1], comment=comment, where=where))),
-        # (void)
-        (re.compile(r'^\s*$'),
-         (lambda comment, where, match: EmptyLine(
-             comment=comment, where=where))),
-    )
+    # [context] or [context](template)
+    context_regex = re.compile(r'^(\s*)\[([^]]*)\](?:\s*\(([^)\+])\))?$')
 
     def __iter__(self):
+        classify = self.classify
         for where, data, comment in super().__iter__():
-            for regex, func in self.regexes:
-                match = regex.match(data)
-                if match:
-                    # Cast the comment to a boolean, we're not using the
-                    # contents, ever.
-                    value = func(bool(comment), where, match)
-                    yield value
-                    break
+            # Cast the comment to a boolean, we're not using the
+            # contents, ever.
+            value = classify(data, bool(comment), where)
+            if value is not None:
+                yield value
+            elif data.lstrip().startswith('#'):
+                # Call the preprocessor, it may insert data into our
+                # internal data generator.
+                self.preprocessor(where, data, bool(comment))
             else:
-                if data.lstrip().startswith('#'):
-                    # Call the preprocessor, it may insert data into our
-                    # internal data generator.
-                    self.preprocessor(where, data, bool(comment))
-                else:
-                    E_CONF_BAD_LINE(where, startswith=data[0:16])
+                E_CONF_BAD_LINE(where, startswith=data[0:16])
+
+    def classify(self, data, comment, where):
+        """
+        Turn a config line into a Context, Varset or EmptyLine, or
+        return None if it is none of those. We look at the first
+        non-blank character only once, instead of trying all line
+        regexes in turn. Contexts are tried first, so "[a=b]" is a
+        context, but "[a]=b" is a varset.
+        """
+        text = data.lstrip()
+        if not text:
+            return EmptyLine(comment=comment, where=where)
+
+        if text[0] == '[':
+            match = self.context_regex.match(data)
+            if match:
+                bolspace, name, templates = match.groups()
+                return Context(
+                    name=name, templates=(templates or ''), comment=comment,
+                    bolspace=bolspace, where=where)
+
+        # "object => value" or "variable = value"; the first equals sign
+        # is the separator. Whitespace around it belongs to the
+        # separator.
+        pos = data.find('=')
+        if pos == -1:
+            return None
+        variable = data[0:pos].rstrip()
+        if data.startswith('>', pos + 1):
+            pos += 2
+        else:
+            pos += 1
+        value = data[pos:].lstrip()
+        return Varset(
+            variable=variable, value=value,
+            separator=data[len(variable):(len(data) - len(value))],
+            comment=comment, where=where)
 
     def preprocessor(self, where, data, comment):
         text = data.lstrip()
@@ -181,31 +191,62 @@ class ConfigParser(object):
 
 
 class ConfigAggregator(VerticalSpaceWarner, ConfigParser):
+    """
+    Collects the varsets into their contexts and yields the contexts.
+
+    By default all contexts are yielded at EOF. If streaming is set, a
+    context is yielded as soon as it is complete: when the next context
+    starts, or at EOF. In that case on_yield is called more than once,
+    every time with only the newly completed contexts.
+    """
+    streaming = False
+
     def __iter__(self):
         self.on_begin()
+        on_context = self.on_context
+        dispatch = {
+            Context: on_context,
+            Varset: self.on_varset,
+            EmptyLine: self.on_emptyline,
+        }
+        streaming = self.streaming
 
         for element in super().__iter__():
             try:
-                if isinstance(element, Context):
-                    self.on_context(element)
-                elif isinstance(element, Varset):
-                    self.on_varset(element)
-                elif isinstance(element, EmptyLine):
-                    self.on_emptyline(element)
-                else:
-                    raise NotImplementedError()
+                handler = dispatch[element.__class__]
+            except KeyError:
+                handler = dispatch[element.__class__] = (
+                    self._get_handler(dispatch, element))
+
+            if streaming and handler is on_context:
+                for item in self.on_yield():
+                    yield item
+
+            try:
+                handler(element)
             except Exception as exc:
                 raise ProgrammingError(str(element.where)) from exc
 
         for item in self.on_yield():
             yield item
 
+    def _get_handler(self, dispatch, element):
+        # Subclasses of the config objects get the handler of their
+        # nearest base.
+        for class_ in element.__class__.__mro__:
+            if class_ in dispatch:
+                return dispatch[class_]
+        raise ProgrammingError(str(element.where)) from (
+            NotImplementedError(element.__class__.__name__))
+
     def on_begin(self):
         self._contexts = []
         self._curcontext = None
 
     def on_yield(self):
-        for context in self._contexts:
+        # Hand over the contexts collected so far.
+        contexts, self._contexts = self._contexts, []
+        for context in contexts:
             yield context
 
     def on_context(self, context):
@@ -29,12 +29,16 @@ if 'we_dont_want_two_linefeeds_between_classdefs':  # for flake8
 
 
 class EmptyLine(object):
+    __slots__ = ('comment', 'where')
+
     def __init__(self, comment, where):
         self.comment = comment
         self.where = where
 
 
 class Context(object):
+    __slots__ = ('name', 'comment', 'where', '_templates', '_varsets')
+
     @classmethod
     def from_context(cls, context, **kwargs):
         """
@@ -86,6 +90,8 @@ class Context(object):
 
 
 class Varset(object):
+    __slots__ = ('variable', 'value', 'comment', 'where', 'arrow')
+
     def __init__(self, variable, value, separator, comment, where):
         clean_separator = separator.strip()
         if clean_separator == '=>':
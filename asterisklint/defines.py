@@ -28,6 +28,7 @@ class DuplicateMessageDef(MessageDefException):
 
 class MessageDefManager(type):
     types = set()
+    classes = {}  # by name, to raise stored messages again
     muted = False
     mute_by_message = set()
 
@@ -35,6 +36,7 @@ class MessageDefManager(type):
     show_previous = False
 
     raised = defaultdict(list)
+    collected = None  # list of messages to hand to another process
 
     # The metaclass invocation. (No need for __prepare__ at this
     # point.)
@@ -63,6 +65,8 @@ class MessageDefManager(type):
                         break
 
         class_ = type.__new__(cls, name, bases, classdict)
+        if name in cls.types:
+            cls.classes[name] = class_
 
         # Add list of callbacks, specific per class.
         class_._callbacks = []
@@ -78,6 +82,11 @@ class MessageDefManager(type):
 
     @classmethod
     def on_message(cls, msg):
+        if cls.collected is not None:
+            # Don't report it here; someone will replay() it later.
+            cls.collected.append(msg)
+            return
+
         cls.raised[msg.__class__.__name__].append(msg)
         formatted = msg.message.format(**msg.fmtkwargs)
 
@@ -123,6 +132,14 @@ class MessageDef(object, metaclass=MessageDefManager):
         # Notify our general manager.
         MessageDefManager.on_message(self)
 
+    def replay(self):
+        """
+        Raise a collected message again, e.g. one that was created in
+        a worker process.
+        """
+        self.call_callbacks(self)
+        MessageDefManager.on_message(self)
+
 
 class ErrorDef(MessageDef):
     pass
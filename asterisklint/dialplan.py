@@ -13,12 +13,19 @@
 #
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
+from bisect import insort
+from itertools import chain
+from multiprocessing import get_all_start_methods, get_context
+from sys import intern
+
 from .application import App
 from .config import ConfigAggregator, Context, Varset
 from .config import (
     E_CONF_CTX_MISSING, E_CONF_KEY_INVALID, H_CONF_NO_ARROW, W_CONF_CTX_DUPE)
-from .defines import ErrorDef, WarningDef, HintDef, DupeDefMixin
-from .pattern import H_PAT_NON_CANONICAL, Pattern
+from .defines import (
+    ErrorDef, WarningDef, HintDef, DupeDefMixin, MessageDefManager)
+from .pattern import (
+    H_PAT_NON_CANONICAL, Pattern, PatternMatcher, PatternTrie)
 from .varfun import Var
 from .where import Where
 
@@ -86,6 +93,10 @@ if 'we_dont_want_two_linefeeds_between_classdefs':  # for flake8
     class W_DP_PRIO_BADORDER(WarningDef):
         message = 'bad priority order for pattern {pat!r} and prio {prio}'
 
+    class W_DP_INCLUDE_CYCLE(WarningDef):
+        message = ('include of {include!r} in context {context!r} creates '
+                   'an include cycle')
+
     class H_DP_GENERAL_MISPLACED(HintDef):
         message = '[general] context not found or not at top of file'
 
@@ -102,6 +113,7 @@ class Dialplan(object):
         self.last_prio = None  # used by the DialplanContext
         self.jump_destinations = []
         self.all_labels = set()  # used when checking jump_destinations
+        self.include_orders = {}  # {context_name: [DialplanContext, ...]}
 
     @property
     def general(self):
@@ -141,17 +153,181 @@ class Dialplan(object):
     def get_context(self, name):
         return self.contexts_by_name[name]
 
+    def get_include_order(self, context):
+        """
+        Return the contexts to search when looking for an extension in
+        context: the context itself and all (recursively) included
+        contexts, in search order, without duplicates. Include cycles
+        and includes of non-existent contexts are skipped.
+        """
+        try:
+            return self.include_orders[context.name]
+        except KeyError:
+            pass
+
+        ret = []
+        seen = set()
+        stack = [context]
+        while stack:
+            context = stack.pop()
+            if context.name in seen:
+                continue
+            seen.add(context.name)
+            ret.append(context)
+            for include in reversed(context.includes):
+                try:
+                    stack.append(self.get_context(include.context_name))
+                except KeyError:
+                    pass
+
+        self.include_orders[ret[0].name] = ret
+        return ret
+
+    def check_include_cycles(self):
+        """
+        Report includes that (indirectly) include their own context.
+        """
+        done = {}  # {context_name: False (in progress) or True (done)}
+        for context in self.contexts:
+            if context.name in done:
+                continue
+            done[context.name] = False
+            stack = [(context, iter(context.includes))]
+            while stack:
+                context, includes = stack[-1]
+                for include in includes:
+                    try:
+                        included = self.get_context(include.context_name)
+                    except KeyError:
+                        continue
+                    state = done.get(included.name)
+                    if state is None:
+                        done[included.name] = False
+                        stack.append((included, iter(included.includes)))
+                        break
+                    elif state is False:
+                        W_DP_INCLUDE_CYCLE(
+                            include.where, context=context.name,
+                            include=included.name)
+                else:
+                    done[context.name] = True
+                    stack.pop()
+
+    def replace_contexts(self, old_contexts, other):
+        """
+        Replace old_contexts (some of our contexts) by the contexts of
+        other, a Dialplan parsed from the file the old contexts came
+        from. The old contexts may not have parts from other files, see
+        asterisklint.watch.
+
+        Returns the jump destinations that need to be walked again: the
+        ones of the new contexts and the ones that could end up in an
+        old or new context.
+        """
+        old_contexts = set(old_contexts)
+        changed = set(context.name for context in old_contexts)
+        changed.update(context.name for context in other.contexts)
+
+        # Contexts that (indirectly) include a changed context are
+        # affected as well, using both the old and the new includes.
+        included_by = {}
+        for context in chain(self.contexts, other.contexts):
+            for include in context.includes:
+                included_by.setdefault(include.context_name, []).append(
+                    context.name)
+        affected = set()
+        stack = list(changed)
+        while stack:
+            name = stack.pop()
+            if name not in affected:
+                affected.add(name)
+                stack.extend(included_by.get(name, ()))
+
+        # The new contexts go where the first old one was.
+        contexts = []
+        position = None
+        for context in self.contexts:
+            if context in old_contexts:
+                if position is None:
+                    position = len(contexts)
+            else:
+                contexts.append(context)
+        if position is None:
+            position = len(contexts)
+        for context in other.contexts:
+            context.dialplan = self
+        contexts[position:position] = other.contexts
+        self.contexts = contexts
+        self.contexts_by_name = dict(
+            (context.name, context) for context in contexts)
+        self.include_orders.clear()
+
+        old_labels = self.all_labels
+        self.all_labels = set(
+            label for context in contexts
+            for cache in context.pattern_cache.values()
+            for label in cache['labels'])
+        labels_changed = (self.all_labels != old_labels)
+
+        # Drop the destinations of the old contexts.
+        old_wheres = set(
+            extension.where for context in old_contexts
+            for extension in context)
+        jump_destinations = [
+            destination for destination in self.jump_destinations
+            if destination[3] not in old_wheres]
+        ret = [
+            destination for destination in jump_destinations
+            if (labels_changed if isinstance(destination[0], Var)
+                else destination[0] in affected)]
+        self.jump_destinations = jump_destinations + other.jump_destinations
+        return ret + other.jump_destinations
+
     def add_jump_destination(self, context, extension, priority, where):
         self.jump_destinations.append((context, extension, priority, where))
 
-    def walk_jump_destinations(self):
+    def walk_jump_destinations(self, jobs=1):
         """
         When the entire dialplan has loaded we can walk over all Goto
         destinations and check for their existence.
+
+        If jobs is larger than 1, the destinations are split up over
+        that many forked worker processes. Their messages are replayed
+        in order, so the output is the same as that of a serial run.
         """
+        if (jobs > 1 and len(self.jump_destinations) > 1 and
+                'fork' in get_all_start_methods()):
+            self._walk_jump_destinations_forked(jobs)
+        else:
+            self._walk_jump_destinations(self.jump_destinations)
+
+    def _walk_jump_destinations_forked(self, jobs):
+        global _walking_dialplan
+
+        # Use a few chunks per job, so a slow chunk does not hold up
+        # the rest.
+        count = len(self.jump_destinations)
+        size = -(-count // (jobs * 4))
+        ranges = [(i, min(i + size, count)) for i in range(0, count, size)]
+
+        # The workers get the dialplan through the fork, instead of
+        # through pickling.
+        _walking_dialplan = self
+        try:
+            with get_context('fork').Pool(jobs) as pool:
+                for messages in pool.imap(
+                        _walk_jump_destinations_range, ranges):
+                    for message in messages:
+                        message.replay()
+        finally:
+            _walking_dialplan = None
+
+    def _walk_jump_destinations(self, jump_destinations):
         valid_destinations = []
+        # The same destinations are used over and over; cache the lookups.
+        found_extensions = {}  # {(context, exten, prio): Extension}
 
-        for context, extension, priority, where in self.jump_destinations:
+        for context, extension, priority, where in jump_destinations:
             if isinstance(context, Var):
                 # We won't look up the context if it's built up from a
                 # variable. We can however proceed and check whether
@@ -178,8 +354,16 @@ class Dialplan(object):
                                     where, context=context, exten=extension,
                                     label=priority)
                     else:
-                        found_extension = found_context.match_pattern(
-                            extension, priority)
+                        key = (context, extension, priority)
+                        try:
+                            found_extension = found_extensions[key]
+                        except KeyError:
+                            found_extension = found_extensions[key] = (
+                                found_context.match_pattern(
+                                    extension, priority))
+                        except TypeError:  # unhashable Var priority
+                            found_extension = found_context.match_pattern(
+                                extension, priority)
                         if found_extension:
                             valid_destinations.append(found_extension)
                         else:
@@ -197,6 +381,8 @@ class Dialplan(object):
         return where
 
     def on_complete(self):
+        self.check_include_cycles()
+
         if not self._general or not self._globals:
             # We don't want messages with an empty where.
             where = self.get_where()
@@ -220,23 +406,21 @@ class Dialplan(object):
         for context in contexts:
             ret.append("[ Context {!r} created by 'pbx_config' ]".format(
                 context.name))
-            last_pattern = None
-            for extension in context.by_pattern():
+            for pattern in context.get_sorted_patterns():
+                extensions = context.extensions_by_pattern[pattern]
                 # NOTE: Asterisk 1.4 and LOW_MEMORY limits show_dialplan
                 # output of extension.prio+app_with_parents to 255
                 # chars. Asterisk 11 limits it to 1023.
-                if extension.pattern == last_pattern:
+                ret.append('  %-17s %-45s [pbx_config]' % (
+                    "'%s' =>" % (extensions[0].pattern,),
+                    ('%d. %s' % (extensions[0].prio,
+                                 extensions[0].app_with_parens))))
+                for extension in extensions[1:]:
                     ret.append('     %-14s %-45s [pbx_config]' % (
                         (extension.label and '[{}]'.format(extension.label) or
                             ''),
                         ('%d. %s' % (extension.prio,
                                      extension.app_with_parens))))
-                else:
-                    last_pattern = extension.pattern
-                    ret.append('  %-17s %-45s [pbx_config]' % (
-                        "'%s' =>" % (extension.pattern,),
-                        ('%d. %s' % (extension.prio,
-                                     extension.app_with_parens))))
             for include in context.includes:
                 ret.append('  %-17s %-45s [pbx_config]' % (
                     'Include =>', "'%s'" % (include.context_name,)))
@@ -244,38 +428,63 @@ class Dialplan(object):
         return '\n'.join(ret)
 
 
+_walking_dialplan = None  # set for the workers of walk_jump_destinations
+
+
+def _walk_jump_destinations_range(range_):
+    """
+    Worker process part of Dialplan.walk_jump_destinations(jobs=N).
+    Returns the messages for the destinations in range_.
+    """
+    start, stop = range_
+    dialplan = _walking_dialplan
+    MessageDefManager.collected = []
+    try:
+        dialplan._walk_jump_destinations(
+            dialplan.jump_destinations[start:stop])
+        return MessageDefManager.collected
+    finally:
+        MessageDefManager.collected = None
+
+
 class DialplanContext(Context):
+    __slots__ = (
+        'dialplan', 'includes', 'context_last_prio', 'pattern_cache',
+        'extensions_by_pattern', '_sorted_patterns', '_pattern_index',
+        '_pattern_matchers')
+
     def __init__(self, *args, **kwargs):
         self.dialplan = kwargs.pop('dialplan')
         super().__init__(*args, **kwargs)
         self.includes = []
         self.context_last_prio = None
         self.pattern_cache = {}
-        self._sorted_patterns = None
+        self.extensions_by_pattern = {}  # {Pattern: [Extension, ...]}
+        self._sorted_patterns = []
+        self._pattern_index = None
+        self._pattern_matchers = {}
 
     def update(self, othercontext):
         assert not othercontext.includes
         assert othercontext.context_last_prio is None
         self.context_last_prio = None
-        self._sorted_patterns = None
         super().update(othercontext)
 
     def by_pattern(self):
         """
-        Used by format_as_dialplan_show().
+        Return the extensions ordered by pattern. Extensions with the
+        same pattern keep their insertion order.
         """
         ret = []
         for pattern in self.get_sorted_patterns():
-            ret.extend(i for i in self if i.pattern == pattern)
+            ret.extend(self.extensions_by_pattern[pattern])
         return ret
 
     def get_sorted_patterns(self):
         """
-        Sort the patterns and return.
+        Return the patterns in sort order. The list is kept sorted by
+        add(), so don't modify it.
         """
-        if self._sorted_patterns is None:
-            self._sorted_patterns = list(
-                sorted(list(set(i.pattern for i in self))))
         return self._sorted_patterns
 
     def has_label(self, label):
@@ -284,39 +493,117 @@ class DialplanContext(Context):
         """
         return any(label in i['labels'] for i in self.pattern_cache.values())
 
+    def get_pattern_index(self):
+        """
+        Build a PatternTrie over the patterns and a priority/label
+        table per pattern, so match_pattern() can do a single lookup.
+        """
+        if self._pattern_index is None:
+            self._pattern_index = (PatternTrie(), {})
+            for extens in self.extensions_by_pattern.values():
+                for exten in extens:
+                    self._add_to_pattern_index(exten)
+        return self._pattern_index
+
+    def _add_to_pattern_index(self, exten):
+        trie, table = self._pattern_index
+        try:
+            entry = table[exten.pattern]
+        except KeyError:
+            trie.add(exten.pattern)
+            entry = table[exten.pattern] = {
+                'extens': self.extensions_by_pattern[exten.pattern],
+                'labels': {}, 'prios': {}}
+        entry['prios'].setdefault(exten.prio, exten)
+        entry['labels'].setdefault(exten.label, exten)
+
+    @staticmethod
+    def _match_priority(entry, priority):
+        """
+        Find the extension for the priority in the pattern index entry.
+        """
+        if isinstance(priority, int):
+            return entry['prios'].get(priority)
+        elif isinstance(priority, str):
+            return entry['labels'].get(priority)
+
+        # Is it a variable? Then format all unknowns as .* and attempt
+        # a regex match.
+        for exten in entry['extens']:
+            if (priority.could_match(exten.prio) or
+                    priority.could_match(exten.label)):
+                return exten
+        return None
+
+    def get_pattern_matcher(self, priority):
+        """
+        Return a PatternMatcher over the patterns that have the
+        priority, and a dict of those patterns to their extension.
+        """
+        try:
+            return self._pattern_matchers[priority]
+        except (KeyError, TypeError):  # TypeError: unhashable Var
+            pass
+
+        trie, table = self.get_pattern_index()
+        extens = {}
+        for pattern in self.get_sorted_patterns():
+            exten = self._match_priority(table[pattern], priority)
+            if exten:
+                extens[pattern] = exten
+        ret = (PatternMatcher(extens.keys()), extens)
+
+        if isinstance(priority, (int, str)):
+            self._pattern_matchers[priority] = ret
+        return ret
+
+    def match_many(self, extensions, priority):
+        """
+        Find the best matching extension for the priority, for many
+        extensions at once. Returns a list with an Extension (or None)
+        for each of the extensions. Behaves like match_pattern().
+        """
+        extensions = list(extensions)
+        ret = [None] * len(extensions)
+        todo = list(range(len(extensions)))
+
+        # Try ourself and our includes, with whatever is left.
+        for context in self.dialplan.get_include_order(self):
+            if not todo:
+                break
+            matcher, extens = context.get_pattern_matcher(priority)
+            found = matcher.first_matches([extensions[i] for i in todo])
+            left = []
+            for i, pattern in zip(todo, found):
+                if pattern:
+                    ret[i] = extens[pattern]
+                else:
+                    left.append(i)
+            todo = left
+
+        # The 'i' extension, as in match_pattern().
+        if todo and isinstance(priority, int):
+            invalid = self.match_pattern('i', 1)
+            for i in todo:
+                if extensions[i] != 'i':
+                    ret[i] = invalid
+
+        return ret
+
     def match_pattern(self, extension, priority):
         """
         Find the best matching extension for the priority.
         """
-        # Matching patterns only.
-        for pattern in self.get_sorted_patterns():
-            if pattern.matches_extension(extension):
-                extens = [i for i in self if i.pattern == pattern]
-                for exten in extens:
-                    if isinstance(priority, int):
-                        if exten.prio == priority:
-                            return exten
-                    elif isinstance(priority, str):
-                        if exten.label == priority:
-                            return exten
-                    # Is it a variable? Then format all unknowns as .*
-                    # and attempt a regex match.
-                    elif (priority.could_match(exten.prio) or
-                            priority.could_match(exten.label)):
-                        return exten
-
-        # Nothing? Try our includes.
-        for include in self.includes:
-            try:
-                context = self.dialplan.get_context(include.context_name)
-            except KeyError:
-                # TODO: An include that does not exist. We should
-                # warn about that somewhere else.
-                pass
-            else:
-                ret = context.match_pattern(extension, priority)
-                if ret:
-                    return ret
+        # Try ourself first, then our includes. Matching patterns only,
+        # in Asterisk sort order.
+        # TODO: An include that does not exist. We should warn about
+        # that somewhere else.
+        for context in self.dialplan.get_include_order(self):
+            trie, table = context.get_pattern_index()
+            for pattern in sorted(trie.matches(extension)):
+                exten = self._match_priority(table[pattern], priority)
+                if exten:
+                    return exten
 
         # > If the location that is put into the channel
         # > information is bogus, and asterisk cannot find that
@@ -341,8 +628,6 @@ class DialplanContext(Context):
         return None
 
     def add(self, extension):
-        self._sorted_patterns = None
-
         # - If extension.pattern is None ("same") then take previous.
         #   Error if there is none.
         # - If prio is N then assert there is a previous prio with same
@@ -372,8 +657,8 @@ class DialplanContext(Context):
         elif extension.prio != 1:
             # Check that there is a prio with N-1.
             try:
-                prev = [i for i in self if i.pattern == extension.pattern][-1]
-            except IndexError:
+                prev = self.extensions_by_pattern[extension.pattern][-1]
+            except KeyError:
                 # TODO: here we have to be careful with pattern
                 # matching, we should check whether a pattern exists
                 # with a greater scope than our pattern.
@@ -454,14 +739,29 @@ class DialplanContext(Context):
                 g_prio = int(g_prio)
             self.dialplan.add_jump_destination(
                 g_context, g_exten, g_prio, extension.where)
+        # They're forwarded; we don't need them here anymore.
+        extension.app.jump_destinations = ()
 
+        # Keep the pattern lookups up to date. Only a new pattern
+        # needs to be inserted into the sorted list.
+        try:
+            self.extensions_by_pattern[extension.pattern].append(extension)
+        except KeyError:
+            self.extensions_by_pattern[extension.pattern] = [extension]
+            insort(self._sorted_patterns, extension.pattern)
+        if self._pattern_index is not None:
+            self._add_to_pattern_index(extension)
+        if self._pattern_matchers:
+            self._pattern_matchers = {}
         super().add(extension)
 
     def add_include(self, include):
         assert isinstance(include, Include)
-        # FIXME: check for dupes and other stupidity (circular includes?)
+        # FIXME: check for dupes and other stupidity (circular includes
+        # are reported by Dialplan.check_include_cycles)
         # FIXME: complain when the include is not at the tail of the context
         self.includes.append(include)
+        self.dialplan.include_orders.clear()
 
 
 class DialplanVarset(object):
@@ -500,7 +800,7 @@ class DialplanVarset(object):
                 if not label.endswith(')'):
                     E_DP_LABEL_INVALID(varset.where)
                     return None
-                label = label[0:-1]
+                label = intern(label[0:-1])
                 # TODO: check label validity
             else:
                 label = None
@@ -528,6 +828,8 @@ class DialplanVarset(object):
 
 
 class Include(object):
+    __slots__ = ('context_name', 'where')
+
     def __init__(self, value, where):
         # FIXME: check for value name? contexts existence?
         self.context_name = value
@@ -535,6 +837,8 @@ class Include(object):
 
 
 class Extension(Varset):
+    __slots__ = ('pattern', 'prio', 'label', 'app')
+
     def __init__(self, pattern, prio, label, app, comment, where):
         # Check pattern voor mixen van letters en pattern-letters:
         # - "s-zap" == "s-[1-9]ap" en zou als "s-[z]ap" geschreven moeten
@@ -572,6 +876,10 @@ class Extension(Varset):
 
 
 class DialplanAggregator(ConfigAggregator):
+    # The dialplan is yielded as a whole; contexts may be continued
+    # further down (or in another file), so they cannot be streamed.
+    streaming = False
+
     def on_begin(self):
         self._dialplan = Dialplan()
         self._prevcontexts = {}
@@ -614,6 +922,7 @@ class DialplanAggregator(ConfigAggregator):
             self._dialplan.contexts.append(dialplancontext)
             self._dialplan.contexts_by_name[dialplancontext.name] = (
                 dialplancontext)
+            self._dialplan.include_orders.clear()
             self._curcontext = dialplancontext
 
     def on_dialplanvarset(self, dialplanvarset):
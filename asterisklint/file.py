@@ -13,8 +13,15 @@
 #
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
-from .defines import ErrorDef, WarningDef
-from .where import Where
+import mmap
+import re
+from functools import partial
+from itertools import count, repeat
+
+from .defines import ErrorDef, MessageDefManager, WarningDef
+from .filecache import freeze_messages, replay_messages
+from .includegraph import IncludeGraph
+from .where import WhereFile
 
 
 if 'we_dont_want_two_linefeeds_between_classdefs':  # for flake8
@@ -52,40 +59,165 @@ if 'we_dont_want_two_linefeeds_between_classdefs':  # for flake8
         message = 'unexpected vertical space at end of file'
 
 
+class BufferScan(object):
+    """
+    Block level scan of an entire file buffer, so the FileReader need
+    not look at every line: which lines (by index) have unusual control
+    characters, and whether there are any carriage returns at all.
+    """
+    # all, except \r (0d), \n (0a), \t (09)
+    illegal = re.compile(b'[\x00-\x08\x0b\x0c\x0e-\x1f]')
+
+    def __init__(self, buf):
+        self.has_cr = (buf.find(b'\r') != -1)
+        self.ctrl_lines = set()
+
+        # Map the byte offsets back to line indexes. Control characters
+        # are rare, so counting the line feeds in between is cheap.
+        index = pos = 0
+        for match in self.illegal.finditer(buf):
+            start = match.start()
+            index += buf[pos:start].count(b'\n')
+            pos = start
+            self.ctrl_lines.add(index)
+
+
 class BinFileReader(object):
     """
     Reads the binary opened file fp, but may open more files with the
     opener if an #include directive is encountered.
+
+    If use_mmap is set, regular files are memory mapped and decoded from
+    UTF-8 in one go. The per-file iterators yield (index, line, data)
+    where data is the decoded line without line feed, or None if the
+    line is not decoded yet. Mapped files also get a BufferScan.
+
+    The files included (or attempted to) are recorded in the
+    include_graph.
     """
+    use_mmap = False
+
     def __init__(self, opener=(lambda filename: open(filename, 'rb'))):
         self._files = []
         self._generators = []
-        self._filenames = []
+        self._wherefiles = []
+        self._scans = []
+        self._records = []
+        self.include_graph = IncludeGraph()
 
         self._opener = opener
 
     def include(self, filename):
+        if self._wherefiles:
+            self.include_graph.add(self._wherefiles[-1].filename, filename)
+        else:
+            self.include_graph.add_root(filename)
+
         fp = self._opener(filename)
 
         if hasattr(fp, 'mode'):
             assert 'b' in fp.mode, 'expected binary opened file'
 
+        lines, scan, record = self._open_lines(fp)
+
         self._files.append(fp)
-        self._generators.append(enumerate(fp))
-        self._filenames.append(fp.name)
+        self._generators.append(lines)
+        self._wherefiles.append(WhereFile(
+            fp.name, reopen=partial(self._opener, filename)))
+        self._scans.append(scan)
+        self._records.append(record)
+
+    def _open_lines(self, fp):
+        """
+        Return the per-file iterator, its BufferScan and its record (see
+        FileReader).
+        """
+        lines, scan = self._read_lines(fp)
+        return lines, scan, None
+
+    def _read_lines(self, fp):
+        if self.use_mmap:
+            try:
+                mapped = mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ)
+            except (AttributeError, OSError, ValueError):
+                # No fileno (BytesIO), not a regular file, or empty.
+                pass
+            else:
+                scan = BufferScan(mapped)
+                try:
+                    text = str(mapped, 'utf-8')
+                except UnicodeDecodeError:
+                    return self._read_mapped(mapped), scan
+                # The common case: all lines are valid UTF-8. (The
+                # mapped file is closed when this iterator is freed.)
+                return zip(count(), iter(mapped.readline, b''),
+                           text.split('\n')), scan
+
+        return zip(count(), fp, repeat(None)), None
+
+    @staticmethod
+    def _read_mapped(mapped):
+        """
+        Decode as many lines as possible in one go, and yield the lines
+        that are not valid UTF-8 undecoded, so the reader can complain
+        about them.
+
+        A failed decode costs as much as the size of what we tried to
+        decode (the error holds a copy). So, after an error, we decode
+        chunks of growing size, instead of all that is left each time:
+        for files in a legacy encoding, the next error is near.
+        """
+        readline = mapped.readline
+        size = len(mapped)
+        chunk = size
+        pos = i = 0
+        try:
+            while pos < size:
+                # Decode up to a line feed, chunk bytes or more ahead.
+                end = size
+                if pos + chunk < size:
+                    end = mapped.find(b'\n', pos + chunk) + 1 or size
+                try:
+                    text = str(mapped[pos:end], 'utf-8')
+                except UnicodeDecodeError as e:
+                    # Decode up to the line with the error.
+                    stop = mapped.rfind(b'\n', pos, pos + e.start) + 1 or pos
+                    text = str(mapped[pos:stop], 'utf-8')
+                    chunk = 4096
+                else:
+                    stop = None
+                    chunk *= 2
+
+                lines = text.split('\n')
+                if not lines[-1]:
+                    lines.pop()  # text ends with a line feed (or is empty)
+
+                mapped.seek(pos)
+                for data in lines:
+                    yield i, readline(), data
+                    i += 1
+
+                if stop is not None:
+                    yield i, readline(), None
+                    i += 1
+                pos = mapped.tell()
+        finally:
+            mapped.close()
 
     def __iter__(self):
         while self._generators:
             try:
-                i, line = next(self._generators[-1])
+                i, line, data = next(self._generators[-1])
             except StopIteration:
                 if hasattr(self._files[-1], 'close'):
                     self._files[-1].close()
                 self._files.pop()
                 self._generators.pop()
-                self._filenames.pop()
+                self._wherefiles.pop()
+                self._scans.pop()
+                self._records.pop()
             else:
-                yield Where(self._filenames[-1], i + 1, line), line
+                yield self._wherefiles[-1].where(i + 1), line
 
 
 class EncodingReader(object):
@@ -111,12 +243,12 @@ class NoCtrlReader(object):
                   '\x08'      '\x0b\x0c'  '\x0e\x0f'
                   '\x10\x11\x12\x13\x14\x15\x16\x17'
                   '\x18\x19\x1a\x1b\x1c\x1d\x1e\x1f')
+    illegal_search = re.compile('[{}]'.format(''.join(sorted(illegal)))).search
 
     def __iter__(self):
+        illegal_search = self.illegal_search
         for where, data in super().__iter__():
-            charset = set(data)
-            union = charset & self.illegal
-            if union:
+            if illegal_search(data):
                 W_FILE_CTRL_CHAR(where)
             yield where, data
 
@@ -275,6 +407,155 @@ class AsteriskCommentReader(object):
             yield where, data, comment
 
 
+class LayeredFileReader(AsteriskCommentReader, FileformatReader,
+                        NoCtrlReader, EncodingReader, BinFileReader):
+    """
+    The FileReader as a stack of generators, one per mixin. Use this
+    if you want to replace one of the layers (see contrib/commands/vg.py).
+    """
+    pass
+
+
 class FileReader(AsteriskCommentReader, FileformatReader, NoCtrlReader,
                  EncodingReader, BinFileReader):
-    pass
+    """
+    Does the same as the LayeredFileReader, but does all the steps in a
+    single loop, instead of passing every line through five generators.
+    It raises the same messages, in the same order.
+
+    If parse_cache is set to a ParseCache, files found in the cache
+    yield (index, None, cached_line) instead, and files not found are
+    recorded (in _records) for the cache. The LayeredFileReader ignores
+    parse_cache: its layers cannot replay cached lines.
+    """
+    use_mmap = True
+    parse_cache = None
+
+    def _open_lines(self, fp):
+        key = self.parse_cache and self.parse_cache.get_key(fp)
+        cached = key and self.parse_cache.load(key)
+        if cached is not None:
+            return zip(count(), repeat(None), cached), None, None
+
+        lines, scan = self._read_lines(fp)
+        return lines, scan, (key and (key, []))
+
+    def __iter__(self):
+        files, generators, wherefiles, scans, records = (
+            self._files, self._generators, self._wherefiles, self._scans,
+            self._records)
+        illegal_search = self.illegal_search
+        asterisk_comment_split = self.asterisk_comment_split
+        fileinfo = []  # see FileformatReader
+        filename = is_dos = None
+
+        # NOTE: The include stack may grow while we're yielding.
+        while generators:
+            # BinFileReader
+            try:
+                i, line, data = next(generators[-1])
+            except StopIteration:
+                if hasattr(files[-1], 'close'):
+                    files[-1].close()
+                files.pop()
+                generators.pop()
+                wherefiles.pop()
+                scans.pop()
+                record = records.pop()
+                if record:
+                    self.parse_cache.store(*record)
+                continue
+            wherefile = wherefiles[-1]
+            where = wherefile.where(i + 1)
+            record = records[-1]
+
+            if line is None:
+                # ParseCache hit: we only redo the line ending checks,
+                # as they depend on the first line of the file.
+                has_lf, has_crlf, data, comment, before, after = data
+                replay_messages(before, where)
+            else:
+                if record:
+                    # Record the messages; send them off ourselves.
+                    collected = MessageDefManager.collected
+                    MessageDefManager.collected = before = []
+
+                # EncodingReader
+                has_lf = line.endswith(b'\n')
+                if data is None:
+                    try:
+                        data = line.decode('utf-8')
+                    except UnicodeDecodeError:
+                        E_FILE_UTF8_BAD(where)
+                        data = line.decode('cp1252')  # or latin1? or 9?
+                    if has_lf:
+                        data = data[0:-1]
+
+                # NoCtrlReader
+                scan = scans[-1]
+                if scan is None:
+                    if illegal_search(data):
+                        W_FILE_CTRL_CHAR(where)
+                elif i in scan.ctrl_lines:
+                    W_FILE_CTRL_CHAR(where)
+
+                has_crlf = (
+                    has_lf and (scan is None or scan.has_cr) and
+                    data.endswith('\r'))
+                if has_crlf:
+                    data = data[0:-1]  # the LF is gone already
+
+                if record:
+                    MessageDefManager.collected = collected
+                    self._send_messages(before)
+
+            # FileformatReader
+            if filename != wherefile.filename:
+                if wherefile.filename in [info[0] for info in fileinfo]:
+                    self._pop_fileinfo(fileinfo, wherefile.filename)
+                else:
+                    fileinfo.append([wherefile.filename, None, None, where])
+                filename, is_dos = fileinfo[-1][0:2]
+
+            last = fileinfo[-1]
+            last[2] = has_lf
+            last[3] = where
+
+            if is_dos is None:
+                is_dos = last[1] = (has_crlf or not has_lf)
+
+            if is_dos:
+                if has_lf and not has_crlf:
+                    W_FILE_DOS_BARELF(where)
+            elif has_crlf:
+                W_FILE_UNIX_CRLF(where)
+
+            if line is None:
+                replay_messages(after, where)
+            else:
+                if record:
+                    MessageDefManager.collected = after = []
+
+                # AsteriskCommentReader
+                if data.endswith((' ', '\t')):
+                    W_WSH_EOL(where)
+                    data = data.rstrip(' \t')
+
+                data, comment = asterisk_comment_split(data, where)
+
+                if record:
+                    MessageDefManager.collected = collected
+                    self._send_messages(after)
+                    record[1].append((
+                        has_lf, has_crlf, data, comment,
+                        freeze_messages(before), freeze_messages(after)))
+
+            yield where, data, comment
+
+        self._pop_fileinfo(fileinfo, None)
+
+    @staticmethod
+    def _send_messages(messages):
+        # The callbacks were called already, when they were raised.
+        for message in messages:
+            MessageDefManager.on_message(message)
@@ -0,0 +1,123 @@
+# AsteriskLint -- an Asterisk PBX config syntax checker
+# Copyright (C) 2015-2022  Walter Doekes, OSSO B.V.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+import marshal
+import os
+from hashlib import sha1
+from tempfile import NamedTemporaryFile
+
+from .alintver import version_str
+from .defines import MessageDefManager
+from .version import AsteriskVersion
+
+
+class ParseCache(object):
+    """
+    An on-disk cache of what the FileReader makes of a file: per line
+    the (data, comment) it yields, the line ending and the messages it
+    raised. Set it as parse_cache on a FileReader and files with the
+    same contents are not decoded and split again.
+
+    The entries are keyed by a hash of the file contents, the
+    asterisklint version and the Asterisk version. They are never
+    removed; clean the directory yourself if it grows too large.
+
+    Example::
+
+        parser = FileDialplanParser()
+        parser.parse_cache = ParseCache('/var/cache/asterisklint')
+        parser.include('extensions.conf')
+    """
+    FORMAT = 1
+
+    def __init__(self, path):
+        self.path = path
+        os.makedirs(path, exist_ok=True)
+
+    def get_key(self, fp):
+        """
+        Return the cache key for the binary opened file fp, or None if
+        the file cannot be read twice.
+        """
+        try:
+            data = fp.read()
+            fp.seek(0)
+        except (AttributeError, OSError, ValueError):
+            return None
+
+        hash_ = sha1(data)
+        hash_.update('\0{}\0{}\0{}\0{}'.format(
+            self.FORMAT, marshal.version, version_str,
+            AsteriskVersion().version).encode('utf-8'))
+        return hash_.hexdigest()
+
+    def load(self, key):
+        """
+        Return the cached lines for key, or None.
+
+        Every line is a tuple (has_lf, has_crlf, data, comment, before,
+        after) where before and after are tuples of messages, raised
+        before and after the line ending checks. A message is a
+        (message name, fmtkwargs) tuple.
+        """
+        try:
+            with open(os.path.join(self.path, key), 'rb') as fp:
+                lines = marshal.loads(fp.read())  # load(fp) is slow
+        except (OSError, EOFError, ValueError, TypeError):
+            return None
+
+        # An entry with messages we do not know (any more) is useless.
+        classes = MessageDefManager.classes
+        for line in lines:
+            if line[4] or line[5]:
+                for name, fmtkwargs in line[4] + line[5]:
+                    if name not in classes:
+                        return None
+        return lines
+
+    def store(self, key, lines):
+        """
+        Store the lines for key, see load(). Failing to write the cache
+        is not an error.
+        """
+        try:
+            with NamedTemporaryFile(
+                    dir=self.path, prefix='.tmp', delete=False) as fp:
+                fp.write(marshal.dumps(lines))
+            os.replace(fp.name, os.path.join(self.path, key))
+        except (OSError, ValueError):
+            try:
+                os.unlink(fp.name)
+            except (NameError, OSError):
+                pass
+
+
+def freeze_messages(messages):
+    """
+    Turn raised messages into (name, fmtkwargs) tuples for the
+    ParseCache.
+    """
+    return tuple(
+        (message.__class__.__name__, message.fmtkwargs)
+        for message in messages)
+
+
+def replay_messages(messages, where):
+    """
+    Raise the messages stored by freeze_messages() again, for where.
+    """
+    classes = MessageDefManager.classes
+    for name, fmtkwargs in messages:
+        classes[name](where, **fmtkwargs)
@@ -0,0 +1,144 @@
+# AsteriskLint -- an Asterisk PBX config syntax checker
+# Copyright (C) 2015-2022  Walter Doekes, OSSO B.V.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+import json
+import os
+from tempfile import NamedTemporaryFile
+
+
+class IncludeGraph(object):
+    """
+    The #include dependencies between config files: the root files
+    (the ones included first), and per file the files it includes. Files
+    that could not be found are in there as well; if they show up, the
+    files including them change.
+
+    The file readers record the graph in their include_graph. Use
+    dump() and load() to keep it around, and update() to merge the
+    graph of a new run into it. Example::
+
+        graph = IncludeGraph.load_file('graph.json')
+        for root in graph.get_roots(['shared/macros.conf']):
+            ...  # lint root again
+    """
+    FORMAT = 1
+
+    def __init__(self):
+        self.roots = []
+        self.includes = {}  # {filename: [included filename, ...]}
+
+    def add_root(self, filename):
+        if filename not in self.roots:
+            self.roots.append(filename)
+        self.includes.setdefault(filename, [])
+
+    def add(self, filename, included):
+        includes = self.includes.setdefault(filename, [])
+        if included not in includes:
+            includes.append(included)
+        self.includes.setdefault(included, [])
+
+    def update(self, other):
+        """
+        Merge other into this graph. The includes of the files in other
+        replace the ones we had.
+        """
+        for root in other.roots:
+            if root not in self.roots:
+                self.roots.append(root)
+        self.includes.update(
+            (filename, list(includes))
+            for filename, includes in other.includes.items())
+
+    def get_files(self, root):
+        """
+        Return the files root includes (recursively), including root.
+        """
+        ret = set()
+        stack = [root]
+        while stack:
+            filename = stack.pop()
+            if filename not in ret:
+                ret.add(filename)
+                stack.extend(self.includes.get(filename, ()))
+        return ret
+
+    def get_roots(self, changed, roots=None):
+        """
+        Return the roots (of all, or of the roots passed) that are, or
+        (recursively) include, one of the changed files. The filenames
+        are compared by absolute path.
+        """
+        changed = set(normpath(filename) for filename in changed)
+        if roots is None:
+            roots = self.roots
+        return [
+            root for root in roots
+            if any(normpath(filename) in changed
+                   for filename in self.get_files(self._find(root)))]
+
+    def has_root(self, filename):
+        return self._find(filename) in self.roots
+
+    def _find(self, filename):
+        # Our name for filename, which may be spelled differently.
+        if filename not in self.includes:
+            path = normpath(filename)
+            for name in self.includes:
+                if normpath(name) == path:
+                    return name
+        return filename
+
+    def dump(self, fp):
+        json.dump({
+            'format': self.FORMAT, 'roots': self.roots,
+            'includes': self.includes}, fp, indent=1, sort_keys=True)
+
+    @classmethod
+    def load(cls, fp):
+        data = json.load(fp)
+        if data.get('format') != cls.FORMAT:
+            raise ValueError('unknown include graph format {!r}'.format(
+                data.get('format')))
+        graph = cls()
+        graph.roots = data['roots']
+        graph.includes = data['includes']
+        return graph
+
+    def dump_file(self, filename):
+        """
+        Write the graph to filename (by replacing it).
+        """
+        with NamedTemporaryFile(
+                'w', dir=(os.path.dirname(filename) or '.'),
+                prefix='.tmp', delete=False) as fp:
+            self.dump(fp)
+        os.replace(fp.name, filename)
+
+    @classmethod
+    def load_file(cls, filename):
+        """
+        Read the graph from filename. Returns an empty graph if there is
+        no such file.
+        """
+        try:
+            with open(filename) as fp:
+                return cls.load(fp)
+        except FileNotFoundError:
+            return cls()
+
+
+def normpath(filename):
+    return os.path.normpath(os.path.abspath(filename))
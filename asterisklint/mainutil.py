@@ -44,6 +44,10 @@ class UniqueStore(argparse.Action):
 
 
 def load_func_odbc_functions(func_odbc_arg, dialplan_arg):
+    """
+    Load the func_odbc functions. Returns the path of the func_odbc.conf
+    loaded, if any.
+    """
     if func_odbc_arg == '':
         # Explicit disable.
         return
@@ -62,3 +66,4 @@ def load_func_odbc_functions(func_odbc_arg, dialplan_arg):
     parser.include(func_odbc_arg)
     for func_odbc_context in parser:
         pass
+    return func_odbc_arg
@@ -15,6 +15,7 @@
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 from functools import total_ordering
 from re import compile as re_compile
+from weakref import WeakValueDictionary
 
 from .defines import HintDef
 
@@ -70,13 +71,30 @@ class Pattern(object):
     NOT_A_PATTERN = 0
     IS_A_PATTERN = 1
 
+    # The values for literal characters, shared by all patterns.
+    LITERALS = tuple((0x100 + i,) for i in range(256))
+
     RE_NO_DASH = re_compile(r'(\[.[^]]*\]|[^][-]+)')
 
+    # Flyweight storage: the parsed values and the canonical form
+    # depend on the raw pattern only. They are shared between all
+    # Pattern instances with the same raw value: {raw: SharedPattern}.
+    # An entry goes away with the last Pattern using it, so long-running
+    # processes do not keep every pattern they have ever seen.
+    shared_patterns = WeakValueDictionary()
+
     # Pattern heeft equality tests zodat "s-zap" == "s-[1-9]ap", maar emit
     # wel een warning als je hier iets anders neerzet! (Zelfde verhaal
     # met hoofdletters vs. kleine letters.)
     def __init__(self, pattern, where):
-        self.raw = pattern
+        try:
+            shared = self.shared_patterns[pattern]
+        except KeyError:
+            shared = self.shared_patterns[pattern] = SharedPattern(
+                pattern, self.parse(pattern))
+
+        self._shared = shared
+        self.raw = shared.raw
         self.where = where
 
         # Values should hold an array of unsigneds:
@@ -100,11 +118,9 @@ class Pattern(object):
         # Let's live with the space complexity for now and cast all
         # to a list of tuples.
         #
-        # We could consider investing in making the Pattern a Fly-Weight
-        # or Singleton, so it doesn't consume more memory than it has
-        # to. (Check sys.getsizeof() for actual space usage.)
-        #
-        self.values = self.parse(pattern)
+        # Because the values are shared (see shared_patterns above),
+        # the space complexity only hurts once per distinct pattern.
+        self.values = shared.values
 
     @classmethod
     def parse(cls, raw):
@@ -117,15 +133,18 @@ class Pattern(object):
 
         return tuple(
             [Pattern.NOT_A_PATTERN] +
-            [(0x100 + i,) for i in bytes(raw, 'utf-8') if i != 0x2d])
+            [cls.LITERALS[i] for i in bytes(raw, 'utf-8') if i != 0x2d])
 
     @classmethod
     def parse_pattern(cls, raw):
         "Takes str, returns list."""
-        raw = list(bytes(raw, 'utf-8'))
+        raw = bytes(raw, 'utf-8')
+        end = len(raw)
+        pos = 0
         ret = []
-        while raw:
-            num = raw.pop(0)
+        while pos < end:
+            num = raw[pos]
+            pos += 1
             if num == 0x2d:             # '-'
                 pass
             elif num in (0x58, 0x78):   # 'X'/'x'
@@ -140,17 +159,17 @@ class Pattern(object):
                 ret.append((0x28000,))
             elif num == 0x5b:           # '['
                 try:
-                    range_end = raw.index(0x5d)  # ']'
+                    range_end = raw.index(0x5d, pos)  # ']'
                 except IndexError:
                     # TODO: raise error!
                     ret.append((0x40000,))
                     return ret
-                ret.append(cls.parse_range_list(raw[0:range_end]))
-                raw = raw[(range_end + 1):]  # drop ']'
+                ret.append(cls.parse_range_list(list(raw[pos:range_end])))
+                pos = range_end + 1  # drop ']'
             else:
                 # TODO: warn on closing bracket or other non-standard
                 # characters
-                ret.append((0x100 + num,))
+                ret.append(cls.LITERALS[num])
 
         ret.append((0x30000,))
         return ret
@@ -198,16 +217,18 @@ class Pattern(object):
 
     @property
     def is_canonical(self):
-        if not hasattr(self, '_is_canonical'):
+        shared = self._shared
+        if shared.is_canonical is None:
             # Strip dashes from the raw version.
             raw_no_dash = ''.join(self.RE_NO_DASH.findall(self.raw))
             # Compare the dashless version with the canonical one.
-            self._is_canonical = (raw_no_dash == self.canonical_pattern)
-        return self._is_canonical
+            shared.is_canonical = (raw_no_dash == self.canonical_pattern)
+        return shared.is_canonical
 
     @property
     def canonical_pattern(self):
-        if not hasattr(self, '_canonical_pattern'):
+        shared = self._shared
+        if shared.canonical_pattern is None:
             if self.values[0] == self.NOT_A_PATTERN:
                 # Hrm.. latin1 here.. not so nice.
                 ret = bytes((i[0] & 0xff)
@@ -225,8 +246,8 @@ class Pattern(object):
                 assert self.values[0] == self.IS_A_PATTERN
                 ret = ('_' + self._canonical_pattern_range(
                     self.values[1:-1]).decode('latin1'))
-            self._canonical_pattern = ret
-        return self._canonical_pattern
+            shared.canonical_pattern = ret
+        return shared.canonical_pattern
 
     def _canonical_pattern_range(self, values):
         common = {
@@ -349,34 +370,64 @@ class Pattern(object):
 
         return ''.join(ret)
 
-    def matches_extension(self, extension):
+    @property
+    def matcher(self):
         """
-        Check if the extension matches this pattern.
+        Return the pattern compiled to a regular expression on the
+        latin1 encoded, dashless extension. Use matches_extension() or
+        match_many() instead of using this directly.
         """
-        i = -1
-        for i, char in enumerate(extension.replace('-', '').encode('latin1')):
-            try:
-                value = self.values[i + 1]
-            except IndexError:
-                return False  # extension is longer than pattern
+        shared = self._shared
+        if shared.matcher is None:
+            shared.matcher = re_compile(self._matcher_regex(self.values))
+        return shared.matcher
 
-            if value[0] in (0x18000, 0x28000, 0x30000):
-                return True
+    @staticmethod
+    def _matcher_regex(values):
+        """
+        Create a regular expression that behaves exactly like the
+        per-character matching in Asterisk (and like PatternTrie).
+        """
+        ret = []
+        for value in values[1:]:
+            num = value[0]
+            if num == 0x18000:          # '.'
+                ret.append(b'(?s:.)')   # need one more, then anything
+                return b''.join(ret)
+            elif num in (0x28000, 0x30000):  # '!' and NUL
+                return b''.join(ret)    # anything goes after this
             elif len(value) == 2:
-                if char not in value[1]:
-                    return False
+                ret.append(b'[' + b''.join(
+                    b'\\x%02x' % (i,) for i in value[1]) + b']')
             else:
-                rangelen = (value[0] >> 8) & 0xff
-                rangestart = value[0] & 0xff
-                if not (rangestart <= char < rangestart + rangelen):
-                    return False
+                rangelen = (num >> 8) & 0xff
+                rangestart = num & 0xff
+                if rangelen == 0:
+                    ret.append(b'(?!)')  # bad range, never matches
+                elif rangelen == 1:
+                    ret.append(b'\\x%02x' % (rangestart,))
+                else:
+                    ret.append(b'[\\x%02x-\\x%02x]' % (
+                        rangestart, rangestart + rangelen - 1))
+        # Out of values; the extension must end here as well.
+        ret.append(b'\\Z')
+        return b''.join(ret)
 
-        # No more characters, but perhaps the pattern is not done yet.
-        try:
-            value = self.values[i + 2]
-        except IndexError:
-            return True
-        return value[0] in (0x28000, 0x30000)
+    def matches_extension(self, extension):
+        """
+        Check if the extension matches this pattern.
+        """
+        return bool(self.matcher.match(
+            extension.replace('-', '').encode('latin1')))
+
+    def match_many(self, extensions):
+        """
+        Check a batch of extensions against this pattern. Returns a
+        list of booleans, in the same order as the extensions.
+        """
+        match = self.matcher.match
+        return [bool(match(extension.replace('-', '').encode('latin1')))
+                for extension in extensions]
 
     def matches_same(self, other):
         """
@@ -409,3 +460,194 @@ class Pattern(object):
 
     def __str__(self):
         return self.raw
+
+
+class SharedPattern(object):
+    """
+    The immutable part of a Pattern, shared between all Patterns with
+    the same raw value. The canonical form and the compiled matcher are
+    filled in on first use.
+    """
+    def __init__(self, raw, values):
+        self.raw = raw
+        self.values = values
+        self.canonical_pattern = None
+        self.is_canonical = None
+        self.matcher = None
+
+
+class PatternTrieNode(object):
+    def __init__(self):
+        self.ends = []          # patterns without more values
+        self.stop_more = []     # patterns continuing with '.'
+        self.stop_always = []   # patterns continuing with '!' or NUL
+        self.chars = {}         # single characters to PatternTrieNode
+        self.ranges = {}        # (other) ranges to PatternTrieNode
+
+
+class PatternTrie(object):
+    """
+    Index over the values of a collection of patterns, so we can find
+    all patterns matching an extension in a single walk, instead of
+    calling Pattern.matches_extension on every pattern in turn.
+
+    The matching rules are exactly those of matches_extension:
+
+    - a '.', '!' or end-of-pattern matches any remaining characters;
+      the '.' requires at least one more;
+    - when the extension is exhausted, the pattern must end right
+      there, or continue with '!' or end-of-pattern.
+
+    Example::
+
+        trie = PatternTrie([Pattern('_X.', None), Pattern('100', None)])
+        trie.matches('100') == [Pattern('_X.'), Pattern('100')]
+    """
+    def __init__(self, patterns=()):
+        self._root = PatternTrieNode()
+        for pattern in patterns:
+            self.add(pattern)
+
+    def add(self, pattern):
+        node = self._root
+        for value in pattern.values[1:]:
+            num = value[0]
+            if num == 0x18000:
+                node.stop_more.append(pattern)
+                return
+            elif num in (0x28000, 0x30000):
+                node.stop_always.append(pattern)
+                return
+            elif len(value) == 1 and (num & 0xff00) == 0x100:
+                children, key = node.chars, num & 0xff
+            else:
+                children, key = node.ranges, value
+            try:
+                node = children[key]
+            except KeyError:
+                node = children[key] = PatternTrieNode()
+        node.ends.append(pattern)
+
+    def matches(self, extension):
+        """
+        Return all patterns that match extension, in no particular
+        order.
+        """
+        chars = extension.replace('-', '').encode('latin1')
+        length = len(chars)
+        ret = []
+        todo = [(self._root, 0)]
+        while todo:
+            node, pos = todo.pop()
+            ret.extend(node.stop_always)
+            if pos == length:
+                ret.extend(node.ends)
+                continue
+            ret.extend(node.stop_more)
+
+            char = chars[pos]
+            try:
+                todo.append((node.chars[char], pos + 1))
+            except KeyError:
+                pass
+            for value, child in node.ranges.items():
+                if len(value) == 2:
+                    if char in value[1]:
+                        todo.append((child, pos + 1))
+                else:
+                    rangelen = (value[0] >> 8) & 0xff
+                    rangestart = value[0] & 0xff
+                    if rangestart <= char < rangestart + rangelen:
+                        todo.append((child, pos + 1))
+        return ret
+
+
+class PatternMatcher(object):
+    """
+    Find the first matching pattern, out of a list of patterns in sort
+    order, for many extensions at once.
+
+    Plain extensions (non-patterns) can only match exactly, and they
+    are sorted before all patterns, so they are looked up in a dict.
+    The patterns are compiled into one regular expression per first
+    character, holding the alternatives that could start with that
+    character, in sort order. The regex engine tries the alternatives
+    left to right, so the first one to match is the winner.
+
+    Example::
+
+        matcher = PatternMatcher(sorted(patterns))
+        for extension, pattern in zip(
+                extensions, matcher.first_matches(extensions)):
+            ...
+    """
+    def __init__(self, patterns):
+        self._literals = {}
+        self._patterns = []
+        self._buckets = {}  # {first_char: (regex, patterns)}
+
+        for pattern in patterns:
+            if pattern.values[0] == Pattern.NOT_A_PATTERN:
+                assert not self._patterns, 'patterns must be sorted'
+                key = bytes((i[0] & 0xff) for i in pattern.values[1:])
+                self._literals.setdefault(key, pattern)
+            else:
+                self._patterns.append(pattern)
+
+    def first_matches(self, extensions):
+        """
+        Return a list with the first matching pattern (or None) for
+        each of the extensions.
+        """
+        literals = self._literals
+        buckets = self._buckets
+        ret = []
+        for extension in extensions:
+            key = extension.replace('-', '').encode('latin1')
+            pattern = literals.get(key)
+            if pattern is None:
+                first_char = key[0] if key else None
+                try:
+                    regex, patterns = buckets[first_char]
+                except KeyError:
+                    regex, patterns = buckets[first_char] = (
+                        self._compile_bucket(first_char))
+                if regex:
+                    match = regex.match(key)
+                    if match:
+                        pattern = patterns[match.lastindex - 1]
+            ret.append(pattern)
+        return ret
+
+    def _compile_bucket(self, first_char):
+        patterns = [i for i in self._patterns
+                    if self._may_start_with(i, first_char)]
+        if not patterns:
+            return None, patterns
+        regex = re_compile(b'|'.join(
+            b'(' + Pattern._matcher_regex(i.values) + b')'
+            for i in patterns))
+        return regex, patterns
+
+    @staticmethod
+    def _may_start_with(pattern, first_char):
+        """
+        Check whether pattern could match an extension starting with
+        first_char (or an empty extension if first_char is None).
+        """
+        try:
+            value = pattern.values[1]
+        except IndexError:
+            return first_char is None
+        num = value[0]
+        if num in (0x28000, 0x30000):
+            return True
+        elif first_char is None:
+            return False
+        elif num == 0x18000:
+            return True
+        elif len(value) == 2:
+            return first_char in value[1]
+        rangelen = (num >> 8) & 0xff
+        rangestart = num & 0xff
+        return rangestart <= first_char < rangestart + rangelen
@@ -0,0 +1,118 @@
+# AsteriskLint -- an Asterisk PBX config syntax checker
+# Copyright (C) 2015-2022  Walter Doekes, OSSO B.V.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+from collections import defaultdict
+
+from .application import AppLoader
+from .config import ProgrammingError
+from .defines import MessageDefManager
+from .varfun import FuncLoader, VarLoader
+
+
+class LintSession(object):
+    """
+    The state of a single lint run: the raised messages, the variables
+    seen and the applications and functions used. The loaders keep the
+    registered applications and functions, and the parsed app data
+    cache; they are loaded once per process, so a session is cheap to
+    create.
+
+    While a session is active, the message manager and the loaders use
+    its state. Functions registered during the session (func_odbc) and
+    unknown names seen are dropped when it ends. Example::
+
+        with LintSession() as session:
+            parser = FileDialplanParser()
+            parser.include('extensions.conf')
+            dialplan = next(iter(parser))
+            dialplan.walk_jump_destinations()
+        for message in session.messages:
+            ...
+
+    Sessions do not nest and are not thread-safe: use processes.
+    """
+    def __init__(self, muted=True):
+        self.muted = muted
+        self.raised = defaultdict(list)  # {message name: [message, ...]}
+        self.variables = defaultdict(list)  # {varname: [where, ...]}
+        self.used_apps = set()  # lower case names
+        self.used_funcs = set()  # lower case names
+        self._saved = None
+
+    @staticmethod
+    def preload():
+        """
+        Load the applications and functions. Call this before forking
+        workers, so they share them.
+        """
+        AppLoader()
+        FuncLoader()
+        VarLoader()
+
+    def __enter__(self):
+        self.activate()
+        return self
+
+    def __exit__(self, type_, value, traceback):
+        self.deactivate()
+
+    def activate(self):
+        if self._saved is not None:
+            raise ProgrammingError('session {!r} is active already'.format(
+                self))
+
+        apploader, funcloader, varloader = (
+            AppLoader(), FuncLoader(), VarLoader())
+        self._saved = (
+            MessageDefManager.raised, MessageDefManager.muted,
+            MessageDefManager.collected,
+            apploader._lower_apps, apploader._used_apps,
+            funcloader._lower_funcs, funcloader._used_funcs,
+            funcloader.generation, varloader._variables)
+
+        MessageDefManager.raised = self.raised
+        MessageDefManager.muted = self.muted
+        MessageDefManager.collected = None
+        # Shallow copies, so we can drop what was added in this run.
+        apploader._lower_apps = apploader._lower_apps.copy()
+        apploader._used_apps = self.used_apps
+        funcloader._lower_funcs = funcloader._lower_funcs.copy()
+        funcloader._used_funcs = self.used_funcs
+        varloader._variables = self.variables
+
+    def deactivate(self):
+        if self._saved is None:
+            raise ProgrammingError('session {!r} is not active'.format(self))
+
+        apploader, funcloader, varloader = (
+            AppLoader(), FuncLoader(), VarLoader())
+        (MessageDefManager.raised, MessageDefManager.muted,
+         MessageDefManager.collected,
+         apploader._lower_apps, apploader._used_apps,
+         funcloader._lower_funcs, funcloader._used_funcs,
+         funcloader.generation, varloader._variables) = self._saved
+        self._saved = None
+
+    @property
+    def messages(self):
+        """
+        All raised messages, ordered by file position.
+        """
+        ret = []
+        for messages in self.raised.values():
+            ret.extend(messages)
+        ret.sort(key=(lambda x: (
+            x.where.filename, x.where.lineno, type(x).__name__)))
+        return ret
@@ -13,9 +13,11 @@
 #
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
+import re
 import string
 from collections import defaultdict
 from importlib import import_module
+from itertools import count
 
 from .cls import Singleton
 from .defines import ErrorDef, WarningDef
@@ -72,6 +74,10 @@ if 'we_dont_want_two_linefeeds_between_classdefs':  # for flake8
 # [A-Za-z0-9_]
 LEGAL_VAR_TOKENS = set(string.ascii_letters + string.digits + '_')
 
+# The brackets of ${...} and $[...]. Both only count their own kind.
+BRACKETS_RE = {'{': re.compile(r'[{}]'), '[': re.compile(r'[\[\]]')}
+CLOSING_BRACKETS = {'{': '}', '[': ']'}
+
 
 class VarParseError(ValueError):
     pass
@@ -82,9 +88,14 @@ class FuncLoader(metaclass=Singleton):
     The FuncLoader loads functions. It is called by the VarLoader when a
     function is encountered.
     """
+    # A new generation number for every change of the loaded functions,
+    # so caches know when to start over.
+    _generations = count()
+
     def __init__(self):
         self._lower_funcs = defaultdict(list)
         self._used_funcs = set()
+        self.generation = next(self._generations)
 
         self.load_all()
 
@@ -127,6 +138,7 @@ class FuncLoader(metaclass=Singleton):
     def register(self, func):
         lower_func = func.name.lower()
         self._lower_funcs[lower_func] = func
+        self.generation = next(self._generations)
 
     def process_read_function(self, func_and_args, where):
         """
@@ -260,64 +272,72 @@ class VarLoader(metaclass=Singleton):
         """
         # SOURCE: main/pbx.c -- ast_str_substitute_variables_full
         # SOURCE: main/pbx.c -- pbx_substitute_variables_full
+        return self._parse_variables(data, 0, len(data), {}, where)
+
+    def _parse_variables(self, data, start, end, bracket_ends, where):
+        # Parse data[start:end]. Nested variables are parsed by offset
+        # as well, so every character is looked at only once and only
+        # the pieces we keep are copied.
         ret = []
-        beginpos = searchpos = 0
-        while True:
-            try:
-                pos = data.index('$', searchpos)
-                next_ = data[pos + 1]
-            except (IndexError, ValueError):
-                ret.append(data[beginpos:])
-                break
-            else:
-                if next_ in '{[':
-                    ret.append(data[beginpos:pos])
-                    if next_ == '{':
-                        endpos, more_substitutions = self._find_brackets_end(
-                            data, pos + 2, '{', '}')
-                    elif next_ == '[':
-                        endpos, more_substitutions = self._find_brackets_end(
-                            data, pos + 2, '[', ']')
-
-                    inner_data = data[(pos + 2):(endpos - 1)]
-                    if more_substitutions:
-                        inner_data = self.parse_variables(
-                            inner_data, where)
-
-                    if next_ == '{':
-                        inner_data = self._process_variable(
-                            inner_data, where)
-                    elif next_ == '[':
-                        inner_data = self._process_expression(
-                            inner_data, where)
-
-                    ret.append(inner_data)
-                    data = data[endpos:]
-                    beginpos = searchpos = 0
+        beginpos = start
+        pos = data.find('$', start, end)
+        while pos != -1 and pos + 1 < end:
+            next_ = data[pos + 1]
+            if next_ == '{' or next_ == '[':
+                ret.append(data[beginpos:pos])
+                endpos = self._find_brackets_end(
+                    data, pos + 1, end, bracket_ends)
+                inner_data = self._parse_variables(
+                    data, pos + 2, endpos - 1, bracket_ends, where)
+
+                if next_ == '{':
+                    inner_data = self._process_variable(inner_data, where)
                 else:
-                    searchpos = pos + 1
+                    inner_data = self._process_expression(inner_data, where)
+
+                ret.append(inner_data)
+                beginpos = endpos
+                pos = data.find('$', endpos, end)
+            else:
+                pos = data.find('$', pos + 1, end)
 
+        if beginpos == start:
+            return data[start:end]  # nothing to substitute
+        ret.append(data[beginpos:end])
         return Var.join(ret)
 
-    def _find_brackets_end(self, data, pos, beginbracket, endbracket):
-        more_substitutions = False
-        brackets = 1
-        while brackets:
-            try:
-                ch = data[pos]
-            except IndexError:
-                raise VarParseError(
-                    'Error in extension logic (missing {!r})'.format(
-                        endbracket))
-            if ch == '$':
-                if data[(pos + 1):(pos + 2)] in '{[':
-                    more_substitutions = True
-            elif ch == beginbracket:
-                brackets += 1
-            elif ch == endbracket:
-                brackets -= 1
-            pos += 1
-        return pos, more_substitutions
+    @staticmethod
+    def _find_brackets_end(data, pos, end, bracket_ends):
+        """
+        Return the position after the bracket that closes the one at
+        pos. Only brackets of the same kind count. It must be before
+        end.
+
+        The brackets we pass on the way are closed as well; those are
+        stored in bracket_ends, so nested variables need not look at
+        the same characters again.
+        """
+        beginbracket = data[pos]
+        ends = bracket_ends.setdefault(beginbracket, {})
+        try:
+            endpos = ends[pos]
+        except KeyError:
+            opened = [pos]
+            brackets_re = BRACKETS_RE[beginbracket]
+            for match in brackets_re.finditer(data, pos + 1, end):
+                if match.group() == beginbracket:
+                    opened.append(match.start())
+                else:
+                    endpos = ends[opened.pop()] = match.start()
+                    if not opened:
+                        return endpos + 1
+            endpos = end
+
+        if endpos >= end:
+            raise VarParseError(
+                'Error in extension logic (missing {!r})'.format(
+                    CLOSING_BRACKETS[beginbracket]))
+        return endpos + 1
 
     def _process_variable(self, data, where):
         """
@@ -14,6 +14,8 @@
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 import re
+from bisect import bisect_right
+from functools import lru_cache
 
 
 class Var(object):
@@ -82,11 +84,24 @@ class Var(object):
         if self.name:  # this is a plain variable, it could match anything
             return True
 
-        re_joined = ''.join(
-            ['^'] +
-            [(re.escape(i) if isinstance(i, str) else '.*') for i in self] +
-            ['$'])
-        return re.match(re_joined, str(value))
+        # The shape (the literals, with None for the variables) is kept
+        # on the instance. Unlike the matcher, it can be pickled along.
+        try:
+            shape = self._shape
+        except AttributeError:
+            shape = self._shape = tuple(self._get_shape())
+        return get_shape_matcher(shape)(str(value))
+
+    def _get_shape(self):
+        # Like the segments, but with every run of variables as a
+        # single None.
+        ret = []
+        for segment in self.get_segments():
+            if isinstance(segment, str):
+                ret.append(segment)
+            elif not ret or ret[-1] is not None:
+                ret.append(None)
+        return ret
 
     def format(self, **kwargs):
         if self.name is None:
@@ -111,9 +126,13 @@ class Var(object):
         which case you get the literal letters, and variables in
         between.
         """
-        return iter(self._get_cached_iter())
+        for segment in self.get_segments():
+            if isinstance(segment, str):
+                yield from segment
+            else:
+                yield segment
 
-    def __getitem__(self, *args, **kwargs):
+    def __getitem__(self, key):
         """
         Get an item or list of items.
 
@@ -129,28 +148,111 @@ class Var(object):
         This should never be a problem because you'll be iterating over
         the results anyway.
         """
-        item = self._get_cached_iter().__getitem__(*args, **kwargs)
-        if isinstance(item, list):
-            ret = list(strjoin(item))  # joins consecutive strings together
-            if len(ret) == 1:
-                return ret[0]
-            return ret
-        return item
+        segments, ends = self.get_segments(), self._get_ends()
+        length = ends[-1]
+
+        if not isinstance(key, slice):
+            index = key.__index__()
+            if index < 0:
+                index += length
+            if not 0 <= index < length:
+                raise IndexError('Var index out of range')
+            i = bisect_right(ends, index)
+            segment = segments[i]
+            if isinstance(segment, str):
+                return segment[index - ends[i] + len(segment)]
+            return segment
+
+        start, stop, step = key.indices(length)
+        if step != 1:
+            ret = list(strjoin(list(self)[key]))
+        else:
+            # Take the (partial) segments from start to stop.
+            ret = []
+            i = bisect_right(ends, start)
+            while start < stop:
+                segment = segments[i]
+                if isinstance(segment, str):
+                    begin = ends[i] - len(segment)
+                    ret.append(segment[(start - begin):(stop - begin)])
+                else:
+                    ret.append(segment)
+                start = ends[i]
+                i += 1
+
+        if len(ret) == 1:
+            return ret[0]
+        return ret
 
     def __len__(self):
-        return len(self._get_cached_iter())
+        return self._get_ends()[-1]
 
-    def _get_cached_iter(self):
-        if not hasattr(self, '_cached_iter'):
-            ret = []
-            if self.name is None:
-                for var in self._list:
-                    for inner in var:
-                        ret.append(inner)
+    def get_segments(self):
+        """
+        Return the contents as a list of str chunks and variables, with
+        the joined variables flattened. No two strings are adjacent.
+        For a plain variable, that is [self].
+        """
+        try:
+            return self._segments
+        except AttributeError:
+            pass
+
+        if self.name is not None:
+            segments = [self]
+        elif self._is_flat():
+            segments = self._list  # no need to copy
+        else:
+            segments = []
+            for var in self._list:
+                for segment in (
+                        [var] if isinstance(var, str) else
+                        var.get_segments()):
+                    if not isinstance(segment, str):
+                        segments.append(segment)
+                    elif not segment:
+                        pass
+                    elif segments and isinstance(segments[-1], str):
+                        segments[-1] += segment
+                    else:
+                        segments.append(segment)
+
+        self._segments = segments
+        return segments
+
+    def _is_flat(self):
+        # Var.join() output usually is: no nested joined variables, and
+        # no empty or consecutive strings.
+        prev_is_str = False
+        for var in self._list:
+            if isinstance(var, str):
+                if prev_is_str or not var:
+                    return False
+                prev_is_str = True
+            elif var.name is None:
+                return False
             else:
-                ret.append(self)
-            self._cached_iter = ret
-        return self._cached_iter
+                prev_is_str = False
+        return True
+
+    def _get_ends(self):
+        # The (character) positions where the segments end; a variable
+        # takes up one position.
+        try:
+            return self._ends
+        except AttributeError:
+            pass
+
+        ends = []
+        end = 0
+        for segment in self.get_segments():
+            end += len(segment) if isinstance(segment, str) else 1
+            ends.append(end)
+        if not ends:
+            ends.append(0)
+
+        self._ends = ends
+        return ends
 
     def __eq__(self, other):
         if not isinstance(other, Var):
@@ -174,7 +276,7 @@ class Var(object):
 
     def split(self, token=':', maxsplit=-1):
         # In case we're an atom, pretend we're a list.
-        if self.name:
+        if self.name is not None:
             list_ = [self.name]  # [name]  # (start, length)
         else:
             list_ = self._list   # [contents...]  # (start, length)
@@ -226,7 +328,7 @@ class Var(object):
         return split_up
 
     def strip(self):
-        if self.name:
+        if self.name is not None:
             return self  # no (deep)copy?
 
         new_list = self._list[:]
@@ -297,6 +399,35 @@ class VarDynSlice(Var):
             self.name, self.start)
 
 
+@lru_cache(maxsize=1024)
+def get_shape_matcher(shape):
+    """
+    Return a function that tells whether a string matches the shape (a
+    tuple of literal strings, with None for anything, see
+    Var.could_match).
+
+    The common prefix + variable shape is matched without a regex.
+    """
+    regex = re.compile(''.join(
+        ['^'] +
+        [('.*' if i is None else re.escape(i)) for i in shape] +
+        ['$']))
+
+    def match_regex(value):
+        return regex.match(value) is not None
+
+    if len(shape) == 2 and shape[1] is None:
+        prefix = shape[0]
+
+        def match_prefix(value):
+            if '\n' in value:  # the regex . and $ are picky about those
+                return match_regex(value)
+            return value.startswith(prefix)
+        return match_prefix
+
+    return match_regex
+
+
 def strjoin(list_of_items_and_strings):
     """
     Joins all consecutive items that are strings together.
@@ -328,8 +459,13 @@ def variable_check_balance(data):
     """
     arr = ['X']
 
-    for char in data:
-        if isinstance(char, Var):
+    if isinstance(data, Var):
+        segments = data.get_segments()
+    else:
+        segments = [data]
+
+    for segment in segments:
+        if isinstance(segment, Var):
             # It's possible that we're looping over a Var variable.
             # In that case we'll have to assume the Var itself
             # contains no separators that we might be interested in.
@@ -340,35 +476,37 @@ def variable_check_balance(data):
             # ``Set(mailbox=mailbox@context)``
             # ``VoiceMail(${mailbox},s)``
             # Same goes for functions.
-            pass  # skip char
-        elif char == '"':
-            if arr[-1] == '"':
-                arr.pop()
-            elif arr[-1] == "'":
-                pass
-            else:
-                arr.append('"')
-        elif char == "'":
-            if arr[-1] == "'":
-                arr.pop()
-            elif arr[-1] == '"':
-                pass
-            else:
-                arr.append("'")
-        elif char in '({[':
-            if arr[-1] in '\'"':
-                pass
-            else:
-                arr.append(char)
-        elif char in ')}]':
-            left = '({['[')}]'.index(char)]
-            if arr[-1] in '\'"':
-                pass
-            else:
-                if arr[-1] == left:
+            continue  # skip char
+
+        for char in segment:
+            if char == '"':
+                if arr[-1] == '"':
                     arr.pop()
+                elif arr[-1] == "'":
+                    pass
+                else:
+                    arr.append('"')
+            elif char == "'":
+                if arr[-1] == "'":
+                    arr.pop()
+                elif arr[-1] == '"':
+                    pass
+                else:
+                    arr.append("'")
+            elif char in '({[':
+                if arr[-1] in '\'"':
+                    pass
+                else:
+                    arr.append(char)
+            elif char in ')}]':
+                left = '({['[')}]'.index(char)]
+                if arr[-1] in '\'"':
+                    pass
                 else:
-                    raise ValueError(''.join(arr[1:]))
+                    if arr[-1] == left:
+                        arr.pop()
+                    else:
+                        raise ValueError(''.join(arr[1:]))
 
     if arr != ['X']:
         raise ValueError(''.join(arr[1:]))
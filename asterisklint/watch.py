@@ -0,0 +1,226 @@
+# AsteriskLint -- an Asterisk PBX config syntax checker
+# Copyright (C) 2015-2022  Walter Doekes, OSSO B.V.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+import os
+import sys
+import time
+
+from . import FileDialplanParser
+from .config import E_CONF_CTX_MISSING
+from .defines import MessageDefManager
+from .dialplan import E_DP_PRIO_MISSING
+
+
+class FilePartDialplanParser(FileDialplanParser):
+    """
+    Parses a single file of a larger dialplan: the dialplan wide checks
+    are left to the caller.
+    """
+    def on_yield(self):
+        yield self._dialplan
+
+
+class FilePoller(object):
+    """
+    Polls files for changes of their modification time, size or inode.
+    (There is no inotify in the standard library.)
+    """
+    def __init__(self, filenames=()):
+        self.set_filenames(filenames)
+
+    def set_filenames(self, filenames):
+        self._stats = dict(
+            (filename, self._stat(filename)) for filename in filenames)
+
+    @staticmethod
+    def _stat(filename):
+        try:
+            st = os.stat(filename)
+        except OSError:
+            return None
+        return (st.st_mtime_ns, st.st_size, st.st_ino)
+
+    def poll(self):
+        """
+        Return the files that changed since the previous poll.
+        """
+        ret = []
+        for filename, stat in self._stats.items():
+            new_stat = self._stat(filename)
+            if new_stat != stat:
+                self._stats[filename] = new_stat
+                ret.append(filename)
+        return ret
+
+
+class DialplanWatcher(object):
+    """
+    Keeps a linted dialplan in memory, and lints it again when one of
+    its files changes.
+
+    If the changed file holds whole contexts only, only that file is
+    parsed again, and only the jump destinations into or out of its
+    contexts are checked again. Otherwise (the first file, files with
+    #include directives, contexts spanning more than one file,
+    [general] or [globals]) the entire dialplan is loaded again.
+
+    Example::
+
+        watcher = DialplanWatcher('extensions.conf')
+        watcher.load()
+        watcher.watch()  # does not return
+    """
+    def __init__(self, filename, jobs=1, parse_cache=None):
+        self.filename = filename
+        self.jobs = jobs
+        self.parse_cache = parse_cache
+        self.dialplan = None
+        self.include_graph = None
+        self.poller = FilePoller()
+
+    def create_parser(self, class_):
+        parser = class_()
+        if self.parse_cache:
+            parser.parse_cache = self.parse_cache
+        return parser
+
+    def load(self):
+        """
+        Load and lint the entire dialplan.
+        """
+        parser = self.create_parser(FileDialplanParser)
+        try:
+            parser.include(self.filename)
+            self.dialplan = next(iter(parser))
+            self.dialplan.walk_jump_destinations(jobs=self.jobs)
+        finally:
+            # Watch the files we got, even if we failed. This includes
+            # the missing ones, in case they show up.
+            self.include_graph = parser.include_graph
+            self.poller.set_filenames(
+                parser.include_graph.get_files(self.filename))
+
+    def relint(self, filename):
+        """
+        Lint again after filename has changed. Returns True if this
+        was done for filename only.
+        """
+        if self.dialplan and self.relint_file(filename):
+            return True
+        self.load()
+        return False
+
+    def relint_file(self, filename):
+        if (filename == self.filename or
+                self.include_graph.includes.get(filename)):
+            return False
+
+        # No contexts: maybe the file was empty or missing. Then we
+        # don't know where the new contexts should go.
+        old_contexts = self.get_contexts_from(filename)
+        if not old_contexts:
+            return False
+
+        # Hold on to the messages until we know we can use them.
+        collected = MessageDefManager.collected
+        MessageDefManager.collected = messages = []
+        try:
+            parser = self.create_parser(FilePartDialplanParser)
+            parser.include(filename)
+            other = next(iter(parser))
+        except OSError:
+            return False
+        finally:
+            MessageDefManager.collected = collected
+
+        if (parser.include_graph.includes[filename] or
+                other._general or other._globals or
+                any(isinstance(message, (E_CONF_CTX_MISSING,
+                                         E_DP_PRIO_MISSING))
+                    for message in messages)):
+            # A context continued from the including file, or
+            # something else that needs the whole picture.
+            return False
+        for context in other.contexts:
+            existing = self.dialplan.contexts_by_name.get(context.name)
+            if existing is not None and existing not in old_contexts:
+                return False
+
+        # The callbacks were called already, when they were raised.
+        for message in messages:
+            MessageDefManager.on_message(message)
+
+        dialplan = self.dialplan
+        jump_destinations = dialplan.replace_contexts(old_contexts, other)
+        self.check_include_cycles(
+            set(context.name for context in old_contexts + other.contexts))
+        dialplan._walk_jump_destinations(jump_destinations)
+        return True
+
+    def get_contexts_from(self, filename):
+        """
+        Return the contexts that came from filename, or None if one of
+        them has parts from other files, or if the file has parts of
+        contexts from elsewhere.
+        """
+        dialplan = self.dialplan
+        for context in (dialplan._general, dialplan._globals):
+            if context and any(
+                    where.filename == filename for where in (
+                        [context.where] + [i.where for i in context])):
+                return None
+
+        ret = []
+        for context in dialplan.contexts:
+            filenames = set([context.where.filename])
+            filenames.update(i.where.filename for i in context)
+            filenames.update(i.where.filename for i in context.includes)
+            if filename in filenames:
+                if len(filenames) > 1:
+                    return None
+                ret.append(context)
+        return ret
+
+    def check_include_cycles(self, context_names):
+        # Only report the cycles with the changed contexts; the others
+        # were reported before.
+        collected = MessageDefManager.collected
+        MessageDefManager.collected = messages = []
+        try:
+            self.dialplan.check_include_cycles()
+        finally:
+            MessageDefManager.collected = collected
+        for message in messages:
+            if (message.fmtkwargs['context'] in context_names or
+                    message.fmtkwargs['include'] in context_names):
+                MessageDefManager.on_message(message)
+
+    def watch(self, interval=0.5, on_change=None):
+        """
+        Poll the files every interval seconds and lint again when they
+        change. Calls on_change(filename) before doing so.
+        """
+        while True:
+            time.sleep(interval)
+            for filename in self.poller.poll():
+                if on_change:
+                    on_change(filename)
+                try:
+                    if not self.relint(filename):
+                        break  # all files were loaded again
+                except OSError as e:
+                    # Keep watching; the file may be back in a moment.
+                    print(e, file=sys.stderr)
+                    break
@@ -13,16 +13,90 @@
 #
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
+from itertools import accumulate, count
+from weakref import WeakValueDictionary
 
 
-class Where(object):
-    def __init__(self, filename, lineno, line):
+class WhereFile(object):
+    """
+    A file that Where objects point into. The line contents are not
+    stored; they are read again through reopen (a callable returning a
+    binary opened file) when someone asks for them, which is rare.
+    """
+    _ids = count()
+    by_id = WeakValueDictionary()  # used when unpickling Where objects
+
+    def __init__(self, filename, reopen=None, lines=None):
+        self.id = next(self._ids)
         self.filename = filename  # shared constant in CPython, so cheap
+        self._reopen = reopen
+        self._lines = lines  # {lineno: line}, if not reopen
+        self._data = None
+        self._offsets = None  # line end offsets into _data
+        self.by_id[self.id] = self
+
+    def where(self, lineno):
+        where = Where.__new__(Where)
+        where.file = self
+        where.lineno = lineno
+        return where
+
+    def get_line(self, lineno):
+        if self._reopen is None:
+            return self._lines and self._lines.get(lineno)
+
+        if self._offsets is None:
+            fp = self._reopen()
+            try:
+                self._data = fp.read()
+            finally:
+                if hasattr(fp, 'close'):
+                    fp.close()
+            self._offsets = list(accumulate(
+                len(i) + 1 for i in self._data.split(b'\n')))
+            self._offsets[-1] -= 1  # no LF after the last line
+
+        if lineno < 1 or lineno > len(self._offsets):
+            return b''
+        return self._data[
+            (lineno > 1 and self._offsets[lineno - 2] or 0):
+            self._offsets[lineno - 1]]
+
+
+class Where(object):
+    """
+    The file position of a config item: a file and a line number. The
+    line itself is looked up when needed.
+    """
+    __slots__ = ('file', 'lineno')
+
+    def __init__(self, filename, lineno, line=None):
+        self.file = WhereFile(filename, lines={lineno: line})
         self.lineno = lineno
-        self.line = line
+
+    @property
+    def filename(self):
+        return self.file.filename
+
+    @property
+    def line(self):
+        return self.file.get_line(self.lineno)
+
+    def __reduce__(self):
+        # Pickle the file by id; the receiving end is expected to be a
+        # forked copy of us. See Dialplan.walk_jump_destinations.
+        return (_unpickle_where, (self.file.id, self.filename, self.lineno))
 
     def __str__(self):
-        return '%s:%d' % (self.filename, self.lineno)
+        return '%s:%d' % (self.file.filename, self.lineno)
+
+
+def _unpickle_where(file_id, filename, lineno):
+    try:
+        file_ = WhereFile.by_id[file_id]
+    except KeyError:
+        file_ = WhereFile(filename)
+    return file_.where(lineno)
 
 
 DUMMY_WHERE = Where(filename='<dummy>', lineno=-1, line='<dummy config line>')
@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+# AsteriskLint -- an Asterisk PBX config syntax checker
+# Copyright (C) 2015-2022  Walter Doekes, OSSO B.V.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+Benchmark the ConfigParser line classification alone: the lines of a
+generated dialplan of N extensions (default 200000) are read up front,
+so the file reading is not measured.
+
+Usage: bench_configparser.py [N]
+"""
+import sys
+
+from benchutil import generate_dialplan, measure
+from asterisklint.config import ConfigParser
+from asterisklint.where import WhereFile
+
+
+class PreparedLines(object):
+    def __init__(self, lines):
+        self._lines = lines
+
+    def __iter__(self):
+        return iter(self._lines)
+
+
+class PreparedConfigParser(ConfigParser, PreparedLines):
+    pass
+
+
+def prepare(data):
+    wherefile = WhereFile('bench.conf')
+    ret = []
+    for i, line in enumerate(data.decode('utf-8').split('\n')):
+        line, sep, comment = line.partition(';')
+        ret.append((wherefile.where(i + 1), line.rstrip(), comment))
+    return ret
+
+
+def parse_all(lines):
+    count = 0
+    for element in PreparedConfigParser(lines):
+        count += 1
+    return count
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+    lines = prepare(generate_dialplan(count))
+    print('lines:              {:d}'.format(len(lines)))
+
+    elapsed, retained, peak = measure(lambda: parse_all(lines))
+    print('{:19s} {:.3f} s ({:.0f} lines/s)'.format(
+        'ConfigParser:', elapsed, len(lines) / elapsed))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+# AsteriskLint -- an Asterisk PBX config syntax checker
+# Copyright (C) 2015-2022  Walter Doekes, OSSO B.V.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+Benchmark the memory used by a loaded dialplan: load a generated
+dialplan of about N lines (default 200000) and report the memory
+retained per extension.
+
+Usage: bench_dialplan_memory.py [N]
+"""
+import sys
+from tempfile import NamedTemporaryFile
+
+from benchutil import generate_dialplan, measure
+from asterisklint import FileDialplanParser
+
+
+def load_dialplan(filename):
+    parser = FileDialplanParser()
+    parser.include(filename)
+    return next(iter(parser))
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+    # Roughly one extension per line.
+    data = generate_dialplan(count)
+    tmp = NamedTemporaryFile(suffix='.conf')
+    tmp.write(data)
+    tmp.flush()
+
+    # The generated dialplan is clean, so every exten/same line is an
+    # extension.
+    extensions = data.count(b'exten => ') + data.count(b'same => ')
+
+    elapsed, retained, peak = measure(
+        (lambda: load_dialplan(tmp.name)), repeat=1)
+    print('lines:          {:d}'.format(data.count(b'\n') + 1))
+    print('extensions:     {:d}'.format(extensions))
+    print('load time:      {:.3f} s'.format(elapsed))
+    print('memory:         {:.1f} MiB ({:.0f} bytes/extension)'.format(
+        retained / 1048576.0, retained / extensions))
+    print('peak memory:    {:.1f} MiB'.format(peak / 1048576.0))
+
+
+if __name__ == '__main__':
+    main()
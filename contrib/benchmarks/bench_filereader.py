@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+# AsteriskLint -- an Asterisk PBX config syntax checker
+# Copyright (C) 2015-2022  Walter Doekes, OSSO B.V.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+Benchmark the FileReader against the LayeredFileReader: read a
+generated dialplan of N extensions (default 200000) line by line. And
+the same dialplan with every fifth line in cp1252 instead of UTF-8.
+
+Usage: bench_filereader.py [N]
+"""
+import sys
+from tempfile import NamedTemporaryFile
+
+from benchutil import generate_dialplan, measure
+from asterisklint.defines import MessageDefManager
+from asterisklint.file import FileReader, LayeredFileReader
+
+
+def read_all(class_, filename):
+    reader = class_()
+    reader.include(filename)
+    count = 0
+    for where, data, comment in reader:
+        count += 1
+    return count
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+    data = generate_dialplan(count)
+    lines = data.count(b'\n') + 1
+    print('lines:              {:d}'.format(lines))
+
+    # Legacy configs: the file reader complains about every line.
+    MessageDefManager.muted = True
+    cp1252_data = b'\n'.join(
+        line + b' ; caf\xe9' if i % 5 == 0 and line else line
+        for i, line in enumerate(data.split(b'\n')))
+
+    for name, data in (('utf-8', data), ('cp1252', cp1252_data)):
+        # A real file, so the FileReader can mmap it.
+        tmp = NamedTemporaryFile(suffix='.conf')
+        tmp.write(data)
+        tmp.flush()
+
+        for class_ in (LayeredFileReader, FileReader):
+            elapsed, retained, peak = measure(
+                lambda: read_all(class_, tmp.name))
+            print('{:19s} {:.3f} s ({:.0f} lines/s)'.format(
+                '{} {}:'.format(class_.__name__, name), elapsed,
+                lines / elapsed))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,84 @@
+# AsteriskLint -- an Asterisk PBX config syntax checker
+# Copyright (C) 2015-2022  Walter Doekes, OSSO B.V.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+Benchmark VarLoader.parse_variables on the application data found in
+tests/extensions.conf (and a few generated lines): every data string
+N times (default 20000), and all of them joined into long argument
+strings of up to N variables.
+
+Usage: bench_parse_variables.py [N]
+"""
+import os
+import sys
+
+from benchutil import measure
+from asterisklint import FileDialplanParser
+from asterisklint.varfun import VarLoader
+from asterisklint.where import DUMMY_WHERE
+
+EXTENSIONS_CONF = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.dirname(
+        os.path.abspath(__file__)))), 'tests', 'extensions.conf')
+
+GENERATED = (
+    'SIP/${EXTEN:1},${TIMEOUT},tT',
+    'CDR(userfield)=${CALLERID(num)}-${UNIQUEID}',
+    'sub-record,s,1(${EXTEN},${IF($[${LEN(${ARG1})}>0]?${ARG1}:x)})',
+)
+
+
+def load_app_data():
+    parser = FileDialplanParser()
+    parser.include(EXTENSIONS_CONF)
+    dialplan = next(iter(parser))
+    ret = []
+    for context in dialplan.contexts:
+        for extension in context:
+            data = extension.app.raw.partition('(')[2][0:-1]
+            if '${' in data or '$[' in data:
+                ret.append(data)
+    return ret + list(GENERATED)
+
+
+def parse_all(data_list):
+    loader = VarLoader()
+    for data in data_list:
+        loader.parse_variables(data, DUMMY_WHERE)
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    app_data = load_app_data()
+    print('app data strings:   {:d}'.format(len(app_data)))
+
+    repeated = app_data * count
+    elapsed, retained, peak = measure(lambda: parse_all(repeated))
+    print('{:19s} {:.3f} s ({:.2f} us/string)'.format(
+        'short strings:', elapsed, elapsed * 1e6 / len(repeated)))
+
+    # Like huge Set() or Dial() arguments. This shows whether the time
+    # is linear in the length.
+    for length in (count // 100, count // 10, count):
+        long_data = ','.join(
+            app_data[i % len(app_data)] for i in range(length))
+        elapsed, retained, peak = measure(lambda: parse_all([long_data]))
+        print('{:19s} {:.3f} s ({:.0f} bytes, {:.1f} MiB peak)'.format(
+            '{} joined:'.format(length), elapsed, len(long_data),
+            peak / 1048576.0))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+# AsteriskLint -- an Asterisk PBX config syntax checker
+# Copyright (C) 2015-2022  Walter Doekes, OSSO B.V.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+Benchmark Pattern creation: parse time and memory for N extension
+patterns (default 100000), most of which are repeats.
+
+Usage: bench_patterns.py [N]
+"""
+import sys
+
+from benchutil import generate_patterns, measure
+from asterisklint.pattern import Pattern
+
+
+def create_patterns(raw_patterns):
+    ret = []
+    for raw in raw_patterns:
+        pattern = Pattern(raw, None)
+        pattern.is_canonical  # computes canonical_pattern as well
+        ret.append(pattern)
+    return ret
+
+
+def clear_caches():
+    # Start cold, so the parse cache is part of the measurements.
+    if hasattr(Pattern, 'shared_patterns'):
+        Pattern.shared_patterns.clear()
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    raw_patterns = generate_patterns(count)
+    elapsed, retained, peak = measure(
+        (lambda: create_patterns(raw_patterns)), setup=clear_caches)
+    print('patterns:       {:d} ({:d} distinct)'.format(
+        count, len(set(raw_patterns))))
+    print('parse time:     {:.3f} s ({:.2f} us/pattern)'.format(
+        elapsed, elapsed * 1e6 / count))
+    print('memory:         {:.1f} MiB ({:.0f} bytes/pattern)'.format(
+        retained / 1048576.0, retained / count))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,122 @@
+# AsteriskLint -- an Asterisk PBX config syntax checker
+# Copyright (C) 2015-2022  Walter Doekes, OSSO B.V.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+Shared helpers for the benchmark scripts in this directory.
+
+The benchmarks run against the asterisklint found in the parent of the
+contrib directory, so you can compare two checkouts by running the same
+script from each.
+"""
+import gc
+import os
+import sys
+import time
+import tracemalloc
+
+if True:
+    # Indented to flake8-ignore E402 (module level import not at top).
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(
+        os.path.abspath(__file__)))))
+    from asterisklint.defines import MessageDefManager
+
+
+# Patterns as found in generated tenant dialplans: a few of them are
+# repeated over and over.
+COMMON_PATTERNS = ('s', 'h', 'i', '_X.', '_[2-9]XXXXXXXXX', '_0031X.')
+
+
+def generate_patterns(count):
+    """
+    Return count raw patterns, mostly repeats of COMMON_PATTERNS,
+    with one in eight a distinct DID.
+    """
+    ret = []
+    for i in range(count):
+        if i % 8 == 7:
+            ret.append('3120{:07d}'.format(i))
+        else:
+            ret.append(COMMON_PATTERNS[i % len(COMMON_PATTERNS)])
+    return ret
+
+
+def generate_dialplan(extensions, per_context=100):
+    """
+    Return a generated extensions.conf (as bytes) with roughly the
+    given number of extensions.
+    """
+    lines = ['[general]', 'static=yes', '', '[globals]', 'TIMEOUT=30', '']
+    contexts = max(1, extensions // per_context)
+    for ctx in range(contexts):
+        lines.append('[tenant-{}]'.format(ctx))
+        for i in range(0, per_context, 4):
+            did = '31201{:03d}{:03d}'.format(ctx % 1000, i)
+            lines.extend([
+                'exten => {},1,NoOp(Incoming for ${{EXTEN}})'.format(did),
+                ' same => n,Set(CDR(userfield)=${{CALLERID(num)}}-{})'.format(
+                    i),
+                ' same => n(dial),Dial(SIP/{}/${{EXTEN:1}},${{TIMEOUT}},tT)'
+                .format(i),
+                ' same => n,Gosub(sub-record,s,1(${EXTEN},${UNIQUEID}))',
+            ])
+        lines.extend([
+            'exten => _X.,1,Goto(tenant-{},s,1)'.format(ctx),
+            'exten => s,1,Playback(tt-monkeys) ; comment',
+            ' same => n,Hangup()',
+            'exten => i,1,Hangup()',
+            '',
+        ])
+    lines.extend([
+        '[sub-record]',
+        'exten => s,1,MixMonitor(${ARG1}-${ARG2}.wav)',
+        ' same => n,Return()',
+        '',
+    ])
+    return '\n'.join(lines).encode('utf-8')
+
+
+def measure(func, repeat=3, setup=None):
+    """
+    Run func repeat times. Return the best wall time, and the memory
+    retained by (and the peak memory during) the last run, in bytes.
+
+    The optional setup is called before every run, outside of the
+    measurements.
+    """
+    MessageDefManager.muted = True
+    best = None
+    for i in range(repeat):
+        if setup:
+            setup()
+        gc.collect()
+        t0 = time.perf_counter()
+        result = func()
+        elapsed = time.perf_counter() - t0
+        if best is None or elapsed < best:
+            best = elapsed
+        del result
+        MessageDefManager.reset()
+
+    if setup:
+        setup()
+    gc.collect()
+    tracemalloc.start()
+    result = func()
+    gc.collect()
+    retained, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    MessageDefManager.reset()
+    return best, retained, peak
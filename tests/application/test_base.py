@@ -13,6 +13,8 @@
 #
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
+from random import Random
+
 from asterisklint.alinttest import ALintTestCase
 from asterisklint.app.base import AppBase
 from asterisklint.app.vall.app_voicemail import VoiceMail
@@ -89,6 +91,48 @@ class AppBaseSeparateArgsTest(ALintTestCase):
             AppBase.separate_args('abc,def[g(h]i(,j],k)),l],m([),]n)o'),
             ['abc', 'def[g(h]i(,j],k))', 'l]', 'm([),]n)o'])
 
+    def test_variables(self):
+        # Variables are opaque: the delimiters inside them are ignored.
+        data = VarLoader().parse_variables(
+            'a${X},"b${CUT(Y,|,2)},c"${Z}\\,d,${W}', DUMMY_WHERE)
+        self.assertEqual(
+            [str(i) for i in AppBase.separate_args(data)],
+            ['a${X}', 'b${CUT(Y,|,2)},c${Z},d', '${W}'])
+
+
+class AppBaseSeparatePlainArgsTest(ALintTestCase):
+    def fuzz(self, alphabet, count=2000):
+        random = Random(1)
+        for i in range(count):
+            yield ''.join(
+                random.choice(alphabet)
+                for j in range(random.randint(0, 20)))
+
+    def test_plain_args(self):
+        # Whatever the brackets/parens, the fast path must give the same
+        # results as the complete implementation.
+        alphabet = ['a', 'bc', ',', '|', '=', '[', ']', '(', ')', ' ', '$']
+        for data in self.fuzz(alphabet):
+            for delimiter in (',', '|', '='):
+                expected = AppBase._separate_args(data, delimiter, True)
+                self.assertEqual(
+                    AppBase._separate_plain_args(data, delimiter), expected,
+                    (data, delimiter))
+                self.assertEqual(
+                    AppBase._separate_args(data, delimiter, False), expected)
+
+    def test_dispatch(self):
+        alphabet = ['a', ',', '|', '[', ']', '(', ')', '"', '\\']
+        for data in self.fuzz(alphabet):
+            for delimiter in (',', '|', '(', '"'):
+                for remove_quotes_backslashes in (True, False):
+                    self.assertEqual(
+                        AppBase.separate_args(
+                            data, delimiter, remove_quotes_backslashes),
+                        AppBase._separate_args(
+                            data, delimiter, remove_quotes_backslashes),
+                        (data, delimiter, remove_quotes_backslashes))
+
 
 class AppBaseCallTest(ALintTestCase):
     def call_app(self, appclass, data):
@@ -0,0 +1,143 @@
+# AsteriskLint -- an Asterisk PBX config syntax checker
+# Copyright (C) 2015-2022  Walter Doekes, OSSO B.V.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+from asterisklint import FileFuncOdbcParser
+from asterisklint.alinttest import ALintTestCase
+from asterisklint.application import App, AppDataCache, AppLoader
+from asterisklint.session import LintSession
+from asterisklint.where import WhereFile
+
+
+class AppDataCacheTest(ALintTestCase):
+    def setUp(self):
+        super().setUp()
+        self.apploader = AppLoader()
+        self.orig_data_cache = self.apploader.data_cache
+        self.data_cache = self.apploader.data_cache = AppDataCache()
+        self.wherefile = WhereFile('test.conf')
+
+    def tearDown(self):
+        self.apploader.data_cache = self.orig_data_cache
+        super().tearDown()
+
+    def create_apps(self, *raws):
+        return [
+            App(raw, self.wherefile.where(lineno))
+            for lineno, raw in enumerate(raws, 1)]
+
+    def test_replay(self):
+        raw = 'Dial(SIP/${FOO-BAR},${TIMEOUT},tT)'
+        with LintSession() as session:
+            apps = self.create_apps(raw, raw, raw)
+
+        self.assertEqual(
+            (self.data_cache.hits, self.data_cache.misses), (2, 1))
+        self.assertEqual(apps[1].data, apps[0].data)
+        self.assertEqual(apps[2].data, apps[0].data)
+        self.assertEqual(
+            [(i.__class__.__name__, i.where.lineno)
+             for i in session.messages],
+            [('E_VAR_BAD_TOKENS', 1), ('E_VAR_BAD_TOKENS', 2),
+             ('E_VAR_BAD_TOKENS', 3)])
+        self.assertEqual(
+            dict((varname, [i.lineno for i in wheres])
+                 for varname, wheres in session.variables.items()),
+            {'FOO-BAR': [1, 2, 3], 'TIMEOUT': [1, 2, 3]})
+        self.assertEqual(session.used_apps, set(['dial']))
+
+    def test_jump_destinations(self):
+        apps = self.create_apps('Goto(ctx,s,1)', 'Goto(ctx,s,1)')
+        self.assertEqual(self.data_cache.hits, 1)
+        self.assertEqual(apps[0].jump_destinations, [('ctx', 's', '1')])
+        self.assertEqual(apps[1].jump_destinations, [('ctx', 's', '1')])
+
+    def test_app_name(self):
+        # Unknown apps are all handled by Unknown; their name is part
+        # of the key, so they get their own messages.
+        with LintSession() as session:
+            self.create_apps('NoSuchApp(x)', 'NoSuchApp(x)', 'Other(x)')
+        self.assertEqual(
+            [(i.__class__.__name__, i.fmtkwargs['app'])
+             for i in session.messages],
+            [('E_APP_MISSING', 'NoSuchApp'), ('E_APP_MISSING', 'NoSuchApp'),
+             ('E_APP_MISSING', 'Other')])
+        self.assertEqual(self.data_cache.hits, 1)
+
+    def test_app_name_in_messages(self):
+        # The parse error names the app as written, so the same data
+        # with another app (or another case) is another entry.
+        with LintSession() as session:
+            self.create_apps(
+                'Foo(${X)', 'Bar(${X)', 'dial(${Y)', 'Dial(${Y)')
+        self.assertEqual(
+            [(i.__class__.__name__, i.where.lineno, i.fmtkwargs['app'])
+             for i in session.messages
+             if i.__class__.__name__ == 'E_APP_PARSE_ERROR'],
+            [('E_APP_PARSE_ERROR', 1, 'Foo'), ('E_APP_PARSE_ERROR', 2, 'Bar'),
+             ('E_APP_PARSE_ERROR', 3, 'dial'),
+             ('E_APP_PARSE_ERROR', 4, 'Dial')])
+        self.assertEqual(self.data_cache.hits, 0)
+
+    def test_nested_apps(self):
+        # ExecIf looks up the app it executes while parsing; that must
+        # be replayed in the next session too.
+        raw = 'ExecIf($[${X}]?Dial(SIP/1):NoSuchThing(1))'
+        for i in range(2):
+            with LintSession() as session:
+                self.create_apps(raw, raw)
+                self.assertEqual(
+                    [i.name for i in self.apploader.used_apps],
+                    ['Dial', 'ExecIf', 'Unknown'])
+                self.assertEqual(
+                    self.apploader.used_modules, ['app_dial', 'app_exec'])
+            self.assertEqual(
+                session.used_apps, set(['dial', 'execif', 'nosuchthing']))
+        # (The nested apps are parsed once as well.)
+        self.assertEqual(
+            (self.data_cache.hits, self.data_cache.misses), (3, 3))
+
+    def test_size(self):
+        self.data_cache.size = 2
+        self.create_apps(
+            'Verbose(${a})', 'Verbose(${b})', 'Verbose(${c})',
+            'Verbose(${a})', 'Verbose(${c})')
+        self.assertEqual(
+            (self.data_cache.hits, self.data_cache.misses), (1, 4))
+
+    def test_new_function(self):
+        raw = 'Set(X=${ODBC_TENANT()})'
+        with LintSession() as session:
+            self.create_apps(raw)
+            reader = self.create_instance_and_load_single_file(
+                FileFuncOdbcParser, 'func_odbc.conf', b'''\
+[TENANT]
+dsn=db
+readsql=SELECT 1
+''')
+            for function in reader:
+                pass
+            self.create_apps(raw)
+        self.assertEqual(
+            [i.__class__.__name__ for i in session.messages],
+            ['E_FUNC_MISSING'])
+        self.assertEqual(self.data_cache.misses, 2)
+
+        # And the function is gone again.
+        with LintSession() as session:
+            self.create_apps(raw)
+        self.assertEqual(
+            [i.__class__.__name__ for i in session.messages],
+            ['E_FUNC_MISSING'])
+        self.assertEqual(self.data_cache.misses, 3)
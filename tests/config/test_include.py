@@ -13,8 +13,12 @@
 #
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
+from importlib import import_module
+from io import StringIO
+
 from asterisklint import FileConfigParser
 from asterisklint.alinttest import ALintTestCase, NamedBytesIO, ignoreLinted
+from asterisklint.includegraph import IncludeGraph
 
 
 class NormalTest(ALintTestCase):
@@ -216,3 +220,74 @@ variable2=value2
         out = [i for i in reader]
         del out
         self.assertLinted({'W_WSV_EOF': 1})
+
+
+class IncludeGraphTest(ALintTestCase):
+    def opener(self, filename):
+        if filename == 'test.conf':
+            return NamedBytesIO(filename, b'''\
+[context1]
+#include "test2.conf"
+#tryinclude "missing.conf"
+#include "test3.conf"
+''')
+        elif filename == 'test2.conf':
+            return NamedBytesIO(filename, b'''\
+#include "test3.conf"
+''')
+        elif filename == 'test3.conf':
+            return NamedBytesIO(filename, b'''\
+variable=value
+''')
+        raise FileNotFoundError(filename)
+
+    def get_graph(self):
+        reader = FileConfigParser(opener=self.opener)
+        reader.include('test.conf')
+        for context in reader:
+            pass
+        return reader.include_graph
+
+    def test_graph(self):
+        graph = self.get_graph()
+        self.assertEqual(graph.roots, ['test.conf'])
+        self.assertEqual(graph.includes, {
+            'test.conf': ['test2.conf', 'missing.conf', 'test3.conf'],
+            'test2.conf': ['test3.conf'],
+            'test3.conf': [],
+            'missing.conf': []})
+
+        self.assertEqual(graph.get_roots(['missing.conf']), ['test.conf'])
+        self.assertEqual(graph.get_roots(['./test3.conf']), ['test.conf'])
+        self.assertEqual(graph.get_roots(['other.conf']), [])
+        self.assertTrue(graph.has_root('./test.conf'))
+        self.assertFalse(graph.has_root('test2.conf'))
+
+    def test_dump_and_load(self):
+        graph = self.get_graph()
+        fp = StringIO()
+        graph.dump(fp)
+        fp.seek(0)
+        loaded = IncludeGraph.load(fp)
+        self.assertEqual(loaded.roots, graph.roots)
+        self.assertEqual(loaded.includes, graph.includes)
+
+    def test_update(self):
+        graph = IncludeGraph()
+        graph.add_root('other.conf')
+        graph.add('other.conf', 'test2.conf')
+        graph.add('test2.conf', 'gone.conf')
+        graph.update(self.get_graph())
+        self.assertEqual(graph.roots, ['other.conf', 'test.conf'])
+        self.assertEqual(
+            graph.get_roots(['test3.conf']), ['other.conf', 'test.conf'])
+        self.assertEqual(graph.get_roots(['gone.conf']), [])
+
+    def test_changed_args(self):
+        # --changed takes one file; it must not eat the dialplan.
+        mainmod = import_module('asterisklint.commands.dialplan-check')
+        args = mainmod.main.parse_args([
+            '--include-graph', 'graph.json', '--changed', 'a.conf',
+            '--changed', 'b.conf', 'tenant/extensions.conf'])
+        self.assertEqual(args.changed, ['a.conf', 'b.conf'])
+        self.assertEqual(args.dialplan, 'tenant/extensions.conf')
@@ -16,6 +16,7 @@
 from asterisklint import FileConfigParser
 from asterisklint.alinttest import ALintTestCase
 from asterisklint.config import Context, Varset
+from asterisklint.defines import MessageDefManager
 
 
 class NormalTest(ALintTestCase):
@@ -52,3 +53,59 @@ and_that_is=it
         variables = [i for i in out[1]]
         self.assertEqual([(i.variable, i.value) for i in variables],
                          [('and_that_is', 'it')])
+
+
+class ClassifyTest(ALintTestCase):
+    def test_lines(self):
+        reader = self.create_instance_and_load_single_file(
+            FileConfigParser, 'test.conf', b'''\
+[a=b]
+[a]=b
+x=>y=z
+ same => n
+empty =
+
+[t](x)
+''')
+        out = [i for i in reader]
+        self.assertEqual([i.name for i in out], ['a=b', 't'])
+        self.assertEqual(
+            [(i.variable, i.value, i.arrow) for i in out[0]],
+            [('[a]', 'b', False), ('x', 'y=z', True), ('same', 'n', True),
+             ('empty', '', False)])
+        self.assertLinted({'I_NOTIMPL_TEMPLATES': 1, 'W_WSH_OBJSET': 1,
+                           'W_WSH_VARSET': 1})
+
+
+class StreamingTest(ALintTestCase):
+    data = b'''\
+[context]
+variable => value
+other=value2
+
+[context2]
+bad line
+and_that_is=it
+'''
+
+    def test_streaming(self):
+        reader = self.create_instance_and_load_single_file(
+            FileConfigParser, 'test.conf', self.data)
+        reader.streaming = True
+        out = []
+        for context in reader:
+            out.append((context.name, len(context),
+                        len(MessageDefManager.raised)))
+        # The first context is complete before the second is read.
+        self.assertEqual(out, [('context', 2, 0), ('context2', 1, 1)])
+        self.assertLinted({'E_CONF_BAD_LINE': 1})
+
+    def test_not_streaming(self):
+        reader = self.create_instance_and_load_single_file(
+            FileConfigParser, 'test.conf', self.data)
+        out = []
+        for context in reader:
+            out.append((context.name, len(context),
+                        len(MessageDefManager.raised)))
+        self.assertEqual(out, [('context', 2, 1), ('context2', 1, 1)])
+        self.assertLinted({'E_CONF_BAD_LINE': 1})
@@ -0,0 +1,100 @@
+# AsteriskLint -- an Asterisk PBX config syntax checker
+# Copyright (C) 2015-2022  Walter Doekes, OSSO B.V.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+import os
+from tempfile import TemporaryDirectory
+
+from asterisklint.alinttest import ALintTestCase
+from asterisklint.batch import (
+    EXIT_ERROR, EXIT_ISSUES, EXIT_OK, lint_dialplan, lint_dialplans)
+
+
+class BatchTest(ALintTestCase):
+    files = {
+        'ok/extensions.conf': b'''\
+[general]
+
+[globals]
+
+[context]
+exten => s,1,Verbose(${ODBC_TENANT()})
+ same => n,Hangup()
+''',
+        'ok/func_odbc.conf': b'''\
+[TENANT]
+dsn=db
+readsql=SELECT 1
+''',
+        'bad/extensions.conf': b'''\
+[general]
+
+[globals]
+
+[context]
+exten => s,1,Verbose(${ODBC_TENANT()})
+ same => n,Goto(nowhere,s,1)
+''',
+    }
+
+    def setUp(self):
+        super().setUp()
+        self.tmpdir = TemporaryDirectory()
+        for filename, data in self.files.items():
+            os.makedirs(os.path.dirname(self.path(filename)), exist_ok=True)
+            with open(self.path(filename), 'wb') as fp:
+                fp.write(data)
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+        super().tearDown()
+
+    def path(self, filename):
+        return os.path.join(self.tmpdir.name, filename)
+
+    def test_ok(self):
+        filename = self.path('ok/extensions.conf')
+        self.assertEqual(lint_dialplan(filename), {
+            'dialplan': filename, 'status': 'ok', 'exit': EXIT_OK,
+            'messages': []})
+
+    def test_issues(self):
+        filename = self.path('bad/extensions.conf')
+        record = lint_dialplan(filename)
+        self.assertEqual(record['status'], 'issues')
+        self.assertEqual(record['exit'], EXIT_ISSUES)
+        self.assertEqual(
+            [(i['class'], i['line']) for i in record['messages']],
+            [('E_FUNC_MISSING', 6), ('E_DP_GOTO_NOCONTEXT', 7)])
+
+    def test_error(self):
+        filename = self.path('missing/extensions.conf')
+        record = lint_dialplan(filename)
+        self.assertEqual(record['status'], 'error')
+        self.assertEqual(record['exit'], EXIT_ERROR)
+        self.assertTrue(record['error'].startswith('FileNotFoundError: '))
+
+    def test_many(self):
+        filenames = [
+            self.path('bad/extensions.conf'),
+            self.path('ok/extensions.conf'),
+            self.path('missing/extensions.conf'),
+            self.path('bad/extensions.conf'),
+        ]
+        records = list(lint_dialplans(filenames))
+        self.assertEqual(
+            [i['status'] for i in records],
+            ['issues', 'ok', 'error', 'issues'])
+        # The same, when forked.
+        self.assertEqual(list(lint_dialplans(filenames, jobs=2)), records)
@@ -55,3 +55,65 @@ include => context1
                     2. Goto(2${EXTEN:1})                          [pbx_config]
   Include =>        'context2'                                    [pbx_config]
 ''')
+
+    @ignoreLinted('H_DP_GENERAL_MISPLACED', 'H_DP_GLOBALS_MISPLACED')
+    def test_include_order(self):
+        reader = self.create_instance_and_load_single_file(
+            FileDialplanParser, 'test.conf', b'''\
+[a]
+exten => 100,1,NoOp(a)
+include => b
+include => c
+include => missing
+
+[b]
+exten => 200,1,NoOp(b)
+include => c
+include => d
+
+[c]
+exten => _X00,1,NoOp(c)
+
+[d]
+exten => _X00,1,NoOp(d)
+exten => i,1,NoOp(invalid)
+''')
+        dialplan = [i for i in reader][0]
+        context = dialplan.get_context('a')
+        self.assertEqual(
+            [i.name for i in dialplan.get_include_order(context)],
+            ['a', 'b', 'c', 'd'])
+        self.assertEqual(
+            [context.match_pattern(i, 1).app.raw
+             for i in ('100', '200', '300', '400', '1')],
+            ['NoOp(a)', 'NoOp(b)', 'NoOp(c)', 'NoOp(c)', 'NoOp(invalid)'])
+        self.assertLinted({})
+
+    @ignoreLinted('H_DP_GENERAL_MISPLACED', 'H_DP_GLOBALS_MISPLACED')
+    def test_include_cycle(self):
+        reader = self.create_instance_and_load_single_file(
+            FileDialplanParser, 'test.conf', b'''\
+[a]
+exten => 100,1,Goto(b,200,1)
+ same => n,Goto(a,300,1)
+ same => n,Goto(a,400,1)
+include => b
+
+[b]
+exten => 200,1,NoOp(b)
+include => c
+include => b
+
+[c]
+exten => _X00,1,NoOp(c)
+include => a
+''')
+        dialplan = [i for i in reader][0]
+        self.assertEqual(
+            [i.name for i in dialplan.get_include_order(
+                dialplan.get_context('c'))],
+            ['c', 'a', 'b'])
+        self.assertLinted({'W_DP_INCLUDE_CYCLE': 2})
+
+        dialplan.walk_jump_destinations()
+        self.assertLinted({})
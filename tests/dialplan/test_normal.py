@@ -15,6 +15,8 @@
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 from asterisklint import FileDialplanParser
 from asterisklint.alinttest import ALintTestCase, ignoreLinted
+from asterisklint.dialplan import (
+    E_DP_GOTO_NOCONTEXT, E_DP_GOTO_NOLABEL, W_DP_GOTO_CONTEXT_NOEXTEN)
 
 
 class NormalTest(ALintTestCase):
@@ -67,3 +69,72 @@ exten => s,1(label1),Verbose(foo1)
         self.assertEqual(contexts[0][2].label, '')  # E_DP_LABEL_DUPE #1
         self.assertEqual(contexts[0][3].label, '')  # E_DP_LABEL_DUPE #2
         self.assertLinted({'E_DP_LABEL_DUPE': 2})
+
+    @ignoreLinted('H_*')
+    def test_compact(self):
+        reader = self.create_instance_and_load_single_file(
+            FileDialplanParser, 'test.conf', b'''\
+[context]
+exten => s,1(start),NoOp(1)
+ same => n,Goto(start)
+include => context2
+
+[context2]
+exten => s,1(start),Verbose(2)
+ same => n,NoOp(2)
+''')
+        dialplan = [i for i in reader][0]
+        context, context2 = dialplan.contexts
+        for obj in (context, context[0], context[0].app,
+                    context.includes[0]):
+            self.assertFalse(hasattr(obj, '__dict__'), obj)
+
+        # Forwarded to the dialplan, so not kept in the app.
+        self.assertEqual(len(dialplan.jump_destinations), 1)
+        self.assertEqual(context[1].app.jump_destinations, ())
+
+        # Interned names and labels.
+        self.assertIs(context[0].label, context2[0].label)
+        self.assertIs(context[0].app.app, context2[1].app.app)
+        self.assertLinted({})
+
+
+@ignoreLinted('H_*')
+class WalkJumpDestinationsTest(ALintTestCase):
+    def walk(self, jobs):
+        gotos = b''.join(
+            b' same => n,Goto(context,%d,1)\n' % (i,) for i in range(20))
+        reader = self.create_instance_and_load_single_file(
+            FileDialplanParser, 'test.conf', b'''\
+[context]
+exten => s,1,Goto(nope,s,1)
+''' + gotos + b'''\
+ same => n,Goto(context,s,nolabel)
+ same => n,Goto(${X},s,nolabel2)
+exten => _1X,1,NoOp
+''')
+        dialplan = [i for i in reader][0]
+
+        # Record the messages in the order they are raised.
+        messages = []
+        for class_ in (E_DP_GOTO_NOCONTEXT, E_DP_GOTO_NOLABEL,
+                       W_DP_GOTO_CONTEXT_NOEXTEN):
+            class_.add_callback(messages.append)
+            self.addCleanup(class_._callbacks.remove, messages.append)
+
+        dialplan.walk_jump_destinations(jobs=jobs)
+        return [
+            (msg.where.lineno, msg.__class__.__name__,
+             msg.message.format(**msg.fmtkwargs)) for msg in messages]
+
+    def test_jobs(self):
+        expected = {
+            'E_DP_GOTO_NOCONTEXT': 1, 'E_DP_GOTO_NOLABEL': 1,
+            'W_DP_GOTO_CONTEXT_NOEXTEN': 11}  # 0..9 and nolabel
+
+        serial = self.walk(jobs=1)
+        self.assertLinted(expected)
+        self.assertEqual(len(serial), 13)
+        # Not only the same messages, but also in the same order.
+        self.assertEqual(self.walk(jobs=3), serial)
+        self.assertLinted(expected)
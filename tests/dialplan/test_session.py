@@ -0,0 +1,112 @@
+# AsteriskLint -- an Asterisk PBX config syntax checker
+# Copyright (C) 2015-2022  Walter Doekes, OSSO B.V.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+from asterisklint import FileDialplanParser, FileFuncOdbcParser
+from asterisklint.alinttest import ALintTestCase
+from asterisklint.application import AppLoader
+from asterisklint.config import ProgrammingError
+from asterisklint.defines import MessageDefManager
+from asterisklint.session import LintSession
+from asterisklint.varfun import FuncLoader
+
+
+class LintSessionTest(ALintTestCase):
+    def lint(self, data):
+        reader = self.create_instance_and_load_single_file(
+            FileDialplanParser, 'test.conf', data)
+        dialplan = next(iter(reader))
+        dialplan.walk_jump_destinations()
+
+    def message_names(self, session):
+        return [
+            type(i).__name__ for i in session.messages
+            if not type(i).__name__.startswith('H_')]
+
+    def test_separate_state(self):
+        with LintSession() as session1:
+            self.lint(b'''\
+[context]
+exten => s,1,Set(FOO=${BAR})
+ same => n,Goto(nowhere,s,1)
+''')
+        with LintSession() as session2:
+            self.lint(b'''\
+[context]
+exten => s,1,Verbose(${LEN(${BAZ})})
+ same => n,Hangup
+''')
+
+        self.assertEqual(
+            self.message_names(session1),
+            ['E_DP_GOTO_NOCONTEXT'])
+        self.assertEqual(session1.used_apps, set(['goto', 'set']))
+        self.assertEqual(session1.used_funcs, set())
+        self.assertEqual(sorted(session1.variables), ['BAR'])
+
+        self.assertEqual(
+            self.message_names(session2),
+            ['W_APP_NEED_PARENS'])
+        self.assertEqual(session2.used_apps, set(['hangup', 'verbose']))
+        self.assertEqual(session2.used_funcs, set(['len']))
+        self.assertEqual(sorted(session2.variables), ['BAZ'])
+
+        # Nothing leaked into the global state.
+        self.assertLinted({})
+
+    def test_unmuted(self):
+        with LintSession(muted=False):
+            self.assertFalse(MessageDefManager.muted)
+        self.assertTrue(MessageDefManager.muted)
+
+    def test_func_odbc_dropped(self):
+        with LintSession() as session:
+            reader = self.create_instance_and_load_single_file(
+                FileFuncOdbcParser, 'func_odbc.conf', b'''\
+[TENANT]
+dsn=db
+readsql=SELECT 1
+''')
+            for function in reader:
+                pass
+            self.lint(b'''\
+[context]
+exten => s,1,Verbose(${ODBC_TENANT()})
+''')
+        self.assertEqual(self.message_names(session), [])
+        self.assertEqual(session.used_funcs, set(['odbc_tenant']))
+
+        with LintSession() as session:
+            self.lint(b'''\
+[context]
+exten => s,1,Verbose(${ODBC_TENANT()})
+''')
+        self.assertEqual(
+            self.message_names(session),
+            ['E_FUNC_MISSING'])
+
+    def test_loaders_not_reloaded(self):
+        apploader, funcloader = AppLoader(), FuncLoader()
+        lower_apps = apploader._lower_apps
+        with LintSession():
+            self.assertIs(AppLoader(), apploader)
+            self.assertIs(FuncLoader(), funcloader)
+            self.assertEqual(apploader._lower_apps, lower_apps)
+        self.assertIs(apploader._lower_apps, lower_apps)
+
+    def test_no_nesting(self):
+        session = LintSession()
+        with session:
+            self.assertRaises(ProgrammingError, session.activate)
+        self.assertRaises(ProgrammingError, session.deactivate)
@@ -0,0 +1,164 @@
+# AsteriskLint -- an Asterisk PBX config syntax checker
+# Copyright (C) 2015-2022  Walter Doekes, OSSO B.V.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+import os
+from tempfile import TemporaryDirectory
+
+from asterisklint import FileDialplanParser
+from asterisklint.alinttest import ALintTestCase
+from asterisklint.defines import MessageDefManager
+from asterisklint.watch import DialplanWatcher, FilePoller
+
+
+class WatchTest(ALintTestCase):
+    files = {
+        'extensions.conf': b'''\
+[general]
+static=yes
+
+[globals]
+X=1
+
+#include "a.conf"
+#include "b.conf"
+''',
+        'a.conf': b'''\
+[a]
+exten => s,1,Goto(b,s,1)
+ same => n,Goto(b,s,lbl)
+''',
+        'b.conf': b'''\
+[b]
+exten => s,1,Goto(a,s,1)
+ same => n(lbl),Hangup()
+''',
+    }
+
+    def setUp(self):
+        super().setUp()
+        self.tmpdir = TemporaryDirectory()
+        for filename, data in self.files.items():
+            self.write(filename, data)
+        self.watcher = DialplanWatcher(self.path('extensions.conf'))
+        self.watcher.load()
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+        super().tearDown()
+
+    def path(self, filename):
+        return os.path.join(self.tmpdir.name, filename)
+
+    def write(self, filename, data):
+        with open(self.path(filename), 'wb') as fp:
+            fp.write(data)
+
+    def assertSameAsLoaded(self):
+        # The incrementally updated dialplan should be the same as a
+        # freshly loaded one, and give the same messages.
+        def walk(dialplan):
+            MessageDefManager.reset()
+            dialplan._walk_jump_destinations(dialplan.jump_destinations)
+            return sorted(
+                (str(msg.where), msg.__class__.__name__)
+                for msgs in MessageDefManager.raised.values()
+                for msg in msgs)
+
+        linted = dict(
+            (name, len(msgs))
+            for name, msgs in MessageDefManager.raised.items())
+        parser = FileDialplanParser()
+        parser.include(self.path('extensions.conf'))
+        dialplan = next(iter(parser))
+        self.assertEqual(
+            self.watcher.dialplan.format_as_dialplan_show(),
+            dialplan.format_as_dialplan_show())
+        self.assertEqual(self.watcher.dialplan.all_labels, dialplan.all_labels)
+        self.assertEqual(walk(self.watcher.dialplan), walk(dialplan))
+        MessageDefManager.reset()
+        return linted
+
+    def test_relint_file(self):
+        self.write('b.conf', b'''\
+[c]
+exten => s,1,Goto(a,s,1)
+ same => n(lbl),Hangup()
+''')
+        self.assertTrue(self.watcher.relint(self.path('b.conf')))
+        self.assertEqual(
+            [context.name for context in self.watcher.dialplan.contexts],
+            ['a', 'c'])
+        self.assertEqual(self.assertSameAsLoaded(), {
+            'E_DP_GOTO_NOCONTEXT': 2})
+
+    def test_relint_label(self):
+        self.write('b.conf', b'''\
+[b]
+exten => s,1,Goto(a,s,1)
+ same => n(other),Hangup()
+''')
+        self.assertTrue(self.watcher.relint(self.path('b.conf')))
+        self.assertEqual(self.assertSameAsLoaded(), {
+            'W_DP_GOTO_CONTEXT_NOEXTEN': 1})
+
+    def test_relint_first_file(self):
+        self.write('extensions.conf', self.files['extensions.conf'] + b'''\
+
+[d]
+exten => s,1,Goto(nowhere,s,1)
+''')
+        self.assertFalse(self.watcher.relint(self.path('extensions.conf')))
+        self.assertEqual(self.assertSameAsLoaded(), {
+            'E_DP_GOTO_NOCONTEXT': 1})
+
+    def test_relint_continued_context(self):
+        self.write('b.conf', b'''\
+exten => t,1,Hangup()
+
+[b]
+exten => s,1,Goto(a,s,1)
+ same => n(lbl),Hangup()
+''')
+        self.assertFalse(self.watcher.relint(self.path('b.conf')))
+        self.assertEqual(self.assertSameAsLoaded(), {})
+
+    def test_relint_existing_context(self):
+        self.write('b.conf', b'''\
+[a]
+exten => t,1,Hangup()
+
+[b]
+exten => s,1,Goto(a,s,1)
+ same => n(lbl),Hangup()
+''')
+        self.assertFalse(self.watcher.relint(self.path('b.conf')))
+        self.assertEqual(self.assertSameAsLoaded(), {})
+
+
+class FilePollerTest(ALintTestCase):
+    def test_poll(self):
+        with TemporaryDirectory() as tmpdir:
+            filename = os.path.join(tmpdir, 'test.conf')
+            with open(filename, 'wb') as fp:
+                fp.write(b'[context]\n')
+            poller = FilePoller([filename])
+            self.assertEqual(poller.poll(), [])
+
+            os.utime(filename, ns=(0, 0))
+            self.assertEqual(poller.poll(), [filename])
+            self.assertEqual(poller.poll(), [])
+
+            os.unlink(filename)
+            self.assertEqual(poller.poll(), [filename])
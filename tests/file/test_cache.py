@@ -0,0 +1,94 @@
+# AsteriskLint -- an Asterisk PBX config syntax checker
+# Copyright (C) 2015-2022  Walter Doekes, OSSO B.V.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+import os
+from tempfile import TemporaryDirectory
+
+from asterisklint.alinttest import ALintTestCase
+from asterisklint.file import FileReader, LayeredFileReader
+from asterisklint.filecache import ParseCache
+
+from . import test_normal
+
+
+class CountingFileReader(FileReader):
+    reads = 0
+
+    def _read_lines(self, fp):
+        CountingFileReader.reads += 1
+        return super()._read_lines(fp)
+
+
+class ParseCacheTest(test_normal.ReadFilesMixin, ALintTestCase):
+    def setUp(self):
+        super().setUp()
+        self.tmpdir = TemporaryDirectory()
+        CountingFileReader.reads = 0
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+        super().tearDown()
+
+    def read_cached(self):
+        class CachedFileReader(CountingFileReader):
+            parse_cache = ParseCache(self.tmpdir.name)
+        return self.read(CachedFileReader)
+
+    def test_cache(self):
+        expected = self.read(FileReader)
+        self.assertLinted(self.expected)
+
+        # Cold, then warm.
+        self.assertEqual(self.read_cached(), expected)
+        self.assertLinted(self.expected)
+        self.assertEqual(CountingFileReader.reads, 2)
+        self.assertEqual(len(os.listdir(self.tmpdir.name)), 2)
+
+        self.assertEqual(self.read_cached(), expected)
+        self.assertLinted(self.expected)
+        self.assertEqual(CountingFileReader.reads, 2)
+
+    def test_changed_contents(self):
+        self.assertEqual(len(self.read_cached()[0]), 8)
+        self.assertLinted(self.expected)
+
+        self.files = dict(self.files)
+        self.files['other.conf'] += b'\nmore=lines\n'
+        lines, messages = self.read_cached()
+        self.assertEqual(lines[6][2:], ('more=lines', ''))
+        self.assertEqual(CountingFileReader.reads, 3)
+        self.assertLinted({
+            'E_FILE_UTF8_BAD': 1, 'W_FILE_CTRL_CHAR': 1,
+            'W_FILE_DOS_BARELF': 1, 'W_FILE_DOS_EOFCRLF': 1,
+            'W_FILE_UNIX_CRLF': 1,
+            'W_WSH_COMMENT': 1, 'W_WSH_EOL': 1})
+
+    def test_layered(self):
+        # The LayeredFileReader cannot replay cached lines, so it
+        # ignores the cache: it neither reads nor fills it.
+        class CachedLayeredFileReader(LayeredFileReader):
+            parse_cache = ParseCache(self.tmpdir.name)
+
+        expected = self.read(LayeredFileReader)
+        self.assertLinted(self.expected)
+        self.assertEqual(self.read(CachedLayeredFileReader), expected)
+        self.assertLinted(self.expected)
+        self.assertEqual(os.listdir(self.tmpdir.name), [])
+
+        self.read_cached()
+        self.assertLinted(self.expected)
+        self.assertEqual(len(os.listdir(self.tmpdir.name)), 2)
+        self.assertEqual(self.read(CachedLayeredFileReader), expected)
+        self.assertLinted(self.expected)
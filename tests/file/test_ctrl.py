@@ -13,8 +13,11 @@
 #
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
+from tempfile import NamedTemporaryFile
+
 from asterisklint.alinttest import ALintTestCase
-from asterisklint.file import FileReader
+from asterisklint.defines import MessageDefManager
+from asterisklint.file import BufferScan, FileReader
 
 
 class CtrlTest(ALintTestCase):
@@ -28,3 +31,38 @@ other=value
         out = [i for i in reader]
         self.assertEqual(len(out), 3)
         self.assertLinted({'W_FILE_CTRL_CHAR': 2})
+
+
+class BufferScanTest(ALintTestCase):
+    data = (
+        b'[context]\x00\r\n'
+        b'variable=value\x0b\x0c\n'
+        b'other=value\n'
+        b'\x1f\n'
+        b'\t\n'
+        b'\x01')
+
+    def test_scan(self):
+        scan = BufferScan(self.data)
+        self.assertEqual(scan.ctrl_lines, set([0, 1, 3, 5]))
+        self.assertTrue(scan.has_cr)
+
+        scan = BufferScan(b'[context]\nvariable=value\n')
+        self.assertEqual(scan.ctrl_lines, set())
+        self.assertFalse(scan.has_cr)
+
+    def test_mapped_file(self):
+        tmp = NamedTemporaryFile()  # auto-deleted, works in testcase
+        tmp.write(self.data)
+        tmp.flush()
+
+        reader = FileReader()
+        reader.include(tmp.name)
+        out = [i for i in reader]
+        self.assertEqual(len(out), 6)
+        self.assertEqual(
+            [i.where.lineno for i in MessageDefManager.raised[
+                'W_FILE_CTRL_CHAR']],
+            [1, 2, 4, 6])
+        self.assertLinted({
+            'W_FILE_CTRL_CHAR': 4, 'W_FILE_DOS_BARELF': 4, 'W_WSH_EOL': 1})
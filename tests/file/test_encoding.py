@@ -13,6 +13,8 @@
 #
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
+from tempfile import NamedTemporaryFile
+
 from asterisklint.alinttest import ALintTestCase
 from asterisklint.file import FileReader
 
@@ -49,3 +51,53 @@ variable=value
         self.assertEqual(len(out), 2)
         self.assertEqual(out[0][1], '[c\u00c3\u00b6nt\u20acxt]')
         self.assertLinted({'E_FILE_UTF8_BAD': 1})
+
+
+class MappedEncodingTest(ALintTestCase):
+    def read_mapped(self, data):
+        tmp = NamedTemporaryFile()  # auto-deleted, works in testcase
+        tmp.write(data)
+        tmp.flush()
+
+        reader = FileReader()
+        reader.include(tmp.name)
+        return [(where.lineno, where.line, data) for where, data, comment
+                in reader]
+
+    def test_utf8(self):
+        out = self.read_mapped(b'[c\xc3\xb6ntext]\nvariable=value')
+        self.assertEqual(out, [
+            (1, b'[c\xc3\xb6ntext]\n', '[c\u00f6ntext]'),
+            (2, b'variable=value', 'variable=value')])
+        self.assertLinted({'W_FILE_UNIX_NOLF': 1})
+
+    def test_utf8_and_cp1252(self):
+        out = self.read_mapped(
+            b'[c\xc3\xb6ntext]\n'
+            b'variable=\x80\n'
+            b'variable2=\xe2\x82\xac\n'
+            b'variable3=\xe2\x82\n')
+        self.assertEqual(out, [
+            (1, b'[c\xc3\xb6ntext]\n', '[c\u00f6ntext]'),
+            (2, b'variable=\x80\n', 'variable=\u20ac'),
+            (3, b'variable2=\xe2\x82\xac\n', 'variable2=\u20ac'),
+            (4, b'variable3=\xe2\x82\n', 'variable3=\u00e2\u201a')])
+        self.assertLinted({'E_FILE_UTF8_BAD': 2})
+
+    def test_many_cp1252(self):
+        # Every fifth line is not UTF-8, and long lines in between, so
+        # that the decode is split up over many chunks.
+        lines = []
+        for i in range(500):
+            if i % 5 == 0:
+                lines.append('v{}=caf\u00e9'.format(i).encode('cp1252'))
+            else:
+                lines.append('v{}={}'.format(i, 'x' * (i * 7)).encode())
+        out = self.read_mapped(b'\n'.join(lines) + b'\n')
+        self.assertEqual(
+            [(lineno, line) for lineno, line, data in out],
+            [(i, line + b'\n') for i, line in enumerate(lines, 1)])
+        self.assertEqual(
+            [data for lineno, line, data in out],
+            [line.decode('cp1252') for line in lines])
+        self.assertLinted({'E_FILE_UTF8_BAD': 100})
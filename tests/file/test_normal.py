@@ -13,8 +13,11 @@
 #
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
-from asterisklint.alinttest import ALintTestCase
-from asterisklint.file import FileReader
+import pickle
+
+from asterisklint.alinttest import ALintTestCase, NamedBytesIO
+from asterisklint.defines import MessageDefManager
+from asterisklint.file import FileReader, LayeredFileReader
 
 
 class NormalTest(ALintTestCase):
@@ -43,3 +46,70 @@ and_that_is=it
 
         self.assertEqual(out[5][0].lineno, 6)
         self.assertEqual(out[5][1], 'and_that_is=it')
+
+    def test_where(self):
+        reader = self.create_instance_and_load_single_file(
+            FileReader, 'test.conf', b'''\
+[context]
+variable=value''')
+        out = [i for i in reader]
+        self.assertEqual(len(out), 2)
+
+        # All lines share the file, the line is looked up when needed.
+        where = out[1][0]
+        self.assertIs(where.file, out[0][0].file)
+        self.assertFalse(hasattr(where, '__dict__'))
+        self.assertEqual(str(where), 'test.conf:2')
+        self.assertEqual(where.line, b'variable=value')
+        self.assertEqual(out[0][0].line, b'[context]\n')
+
+        # Pickling keeps the reference to the file.
+        copy = pickle.loads(pickle.dumps(where))
+        self.assertIs(copy.file, where.file)
+        self.assertEqual(copy.lineno, 2)
+        self.assertLinted({'W_FILE_UNIX_NOLF': 1})
+
+
+class ReadFilesMixin(object):
+    files = {
+        'test.conf': (
+            b'[context] \r\n'
+            b'variable=value;comment\r\n'
+            b'#include other.conf\r\n'
+            b'other=value\\;x \t; comment\n'
+            b'\x01ctrl=\xe9\r\n'),
+        'other.conf': (
+            b'\n'
+            b'[context2]\r\n'
+            b'and_that_is=it'),
+    }
+    expected = {
+        'E_FILE_UTF8_BAD': 1, 'W_FILE_CTRL_CHAR': 1,
+        'W_FILE_DOS_BARELF': 1, 'W_FILE_DOS_EOFCRLF': 1,
+        'W_FILE_UNIX_CRLF': 1, 'W_FILE_UNIX_NOLF': 1,
+        'W_WSH_COMMENT': 1, 'W_WSH_EOL': 1}
+
+    def read(self, class_):
+        def opener(fn):
+            return NamedBytesIO(fn, self.files[fn])
+
+        reader = class_(opener=opener)
+        reader.include('test.conf')
+        lines = []
+        for where, data, comment in reader:
+            if data == '#include other.conf':
+                reader.include('other.conf')
+            lines.append((str(where), where.line, data, comment))
+
+        messages = sorted(
+            (str(msg.where), msg.__class__.__name__)
+            for msgs in MessageDefManager.raised.values() for msg in msgs)
+        return lines, messages
+
+
+class LayeredTest(ReadFilesMixin, ALintTestCase):
+    def test_same_as_layered(self):
+        expected = self.read(LayeredFileReader)
+        self.assertLinted(self.expected)
+        self.assertEqual(self.read(FileReader), expected)
+        self.assertLinted(self.expected)
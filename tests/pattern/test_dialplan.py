@@ -15,6 +15,7 @@
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 from asterisklint import FileDialplanParser
 from asterisklint.alinttest import ALintTestCase
+from asterisklint.dialplan import Extension
 
 
 class PatternDialplanTest(ALintTestCase):
@@ -52,6 +53,32 @@ exten => _X!,n,NoOp(_X!,2)
             [i.raw for i in patterns],
             ['s', 's', '100', '100', '100', '101', '_X!', '_X!'])
 
+    def test_sorted_patterns(self):
+        reader = self.create_instance_and_load_single_file(
+            FileDialplanParser, 'test.conf', b'''\
+[general]
+
+[globals]
+
+[context]
+exten => _X!,1,NoOp(_X!,1)
+exten => 101,1,NoOp(101,1)
+exten => s,1,NoOp(s,1)
+exten => _1XX,1,NoOp(_1XX,1)
+exten => 100,1,NoOp(100,1)
+exten => 101,2,NoOp(101,2)
+exten => _X!,2,NoOp(_X!,2)
+exten => _[1-9]XX,1,NoOp(_[1-9]XX,1)
+''')
+        context = [i for i in reader][0].contexts[0]
+        self.assertEqual(
+            context.get_sorted_patterns(),
+            sorted(set(i.pattern for i in context)))
+        self.assertEqual(
+            [i.raw for i in context.get_sorted_patterns()],
+            ['100', '101', 's', '_1XX', '_[1-9]XX', '_X!'])
+        self.assertLinted({'H_PAT_NON_CANONICAL': 1})
+
     def test_canonical_hints(self):
         patterns = self.do_patterns('''\
 exten => _s[2-9]ob,1,NoOp(1)
@@ -72,3 +99,81 @@ exten => _[0-9a-f].,n,NoOp(2)
             [i.canonical_pattern for i in patterns],
             ['_[0-9a-f].', '_[0-9a-f].'])
         self.assertLinted({})  # nothing wrong with this..
+
+
+class PatternMatchTest(ALintTestCase):
+    def load_context(self, snippet):
+        reader = self.create_instance_and_load_single_file(
+            FileDialplanParser, 'test.conf', snippet)
+        dialplan = [i for i in reader][0]
+        return dialplan.contexts[0]
+
+    def test_match_order(self):
+        context = self.load_context(b'''\
+[general]
+
+[globals]
+
+[context]
+exten => _X.,1,NoOp(any)
+exten => _X.,n(label),NoOp(any-label)
+exten => _1XX,1,NoOp(1xx)
+exten => 100,1,NoOp(100)
+exten => 100,n,NoOp(100-2)
+exten => i,1,NoOp(invalid)
+''')
+        self.assertEqual(
+            context.match_pattern('100', 1).app.raw, 'NoOp(100)')
+        self.assertEqual(
+            context.match_pattern('101', 1).app.raw, 'NoOp(1xx)')
+        self.assertEqual(
+            context.match_pattern('101', 2).app.raw, 'NoOp(any-label)')
+        self.assertEqual(
+            context.match_pattern('100', 'label').app.raw, 'NoOp(any-label)')
+        self.assertEqual(
+            context.match_pattern('100', 3).app.raw, 'NoOp(invalid)')
+        self.assertIsNone(context.match_pattern('100', 'nolabel'))
+
+        # Adding extensions afterwards updates the index.
+        any_ = context[0]
+        context.add(Extension(
+            any_.pattern, 3, None, any_.app, False, any_.where))
+        self.assertEqual(
+            context.match_pattern('100', 3).app.raw, 'NoOp(any)')
+        self.assertLinted({})
+
+    def test_match_many(self):
+        reader = self.create_instance_and_load_single_file(
+            FileDialplanParser, 'test.conf', b'''\
+[general]
+
+[globals]
+
+[context]
+exten => 0031201234567,1,NoOp(literal)
+exten => _0031[1-9]XXXXXXXX,1,NoOp(nl)
+exten => _0031[1-9]XXXXXXXX,n(label),NoOp(nl-label)
+exten => _X!,2,NoOp(any-2)
+include => other
+include => missing
+exten => i,1,NoOp(invalid)
+
+[other]
+exten => _00X.,1,NoOp(intl)
+exten => _1XX,1,NoOp(1xx)
+''')
+        dialplan = [i for i in reader][0]
+        context = dialplan.contexts[0]
+        numbers = [
+            '0031201234567', '0031-20-1234567', '0031201234568',
+            '00312012345', '0044123', '100', '1000', '200', 'i', '', 's']
+        for priority in (1, 2, 3, 'label', 'nolabel'):
+            self.assertEqual(
+                context.match_many(numbers, priority),
+                [context.match_pattern(i, priority) for i in numbers],
+                priority)
+        self.assertEqual(
+            [i.app.raw for i in context.match_many(numbers[0:6], 1)],
+            ['NoOp(literal)', 'NoOp(literal)', 'NoOp(nl)',
+             'NoOp(intl)', 'NoOp(intl)', 'NoOp(1xx)'])
+        self.assertLinted({'H_PAT_NON_CANONICAL': 2, 'W_DP_PRIO_BADORDER': 1})
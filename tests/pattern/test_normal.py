@@ -13,8 +13,10 @@
 #
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
+import gc
+
 from asterisklint.alinttest import ALintTestCase
-from asterisklint.pattern import Pattern
+from asterisklint.pattern import Pattern, PatternMatcher, PatternTrie
 
 
 class PatternOrderTest(ALintTestCase):
@@ -105,3 +107,118 @@ class PatternOrderTest(ALintTestCase):
             raise AssertionError(
                 "{} should be lower than {} but isn't".format(
                     pattern_a, pattern_b))
+
+
+class PatternTrieTest(ALintTestCase):
+    patterns = (
+        '100', '1-0-1', '_100', '_1XX', '_1X.', '_1X!', '_X', '_X.', '_X!',
+        '_[13-5]!', '_[0-59]X', '_N[a-c]', '_s-[1259]', 's', 's-zap',
+        'h', 'i', '_.', '_!', '_ZZ', '_[1-]XX',
+    )
+    extensions = (
+        '', '1', '10', '100', '101', '1-0-0', '102', '1000', '2', '25',
+        '2a', '2d', '3', '9X', 's', 's-1', 's-3', 's-zap', 'sz', 'h', 'i',
+        '-', '-1', '123456789',
+    )
+
+    def test_same_as_matches_extension(self):
+        patterns = [Pattern(i, None) for i in self.patterns]
+        trie = PatternTrie(patterns)
+        for extension in self.extensions:
+            expected = [
+                i.raw for i in patterns if i.matches_extension(extension)]
+            found = [i.raw for i in trie.matches(extension)]
+            self.assertEqual(
+                sorted(found), sorted(expected), 'extension %r' % (extension,))
+
+    def test_empty(self):
+        trie = PatternTrie()
+        self.assertEqual(trie.matches('100'), [])
+
+
+class PatternMatcherTest(ALintTestCase):
+    def test_same_as_first_match(self):
+        patterns = sorted(Pattern(i, None) for i in PatternTrieTest.patterns)
+        matcher = PatternMatcher(patterns)
+        extensions = PatternTrieTest.extensions
+        expected = []
+        for extension in extensions:
+            for pattern in patterns:
+                if pattern.matches_extension(extension):
+                    expected.append(pattern)
+                    break
+            else:
+                expected.append(None)
+        self.assertEqual(matcher.first_matches(extensions), expected)
+
+    def test_unsorted(self):
+        self.assertRaises(AssertionError, PatternMatcher, [
+            Pattern('_X.', None), Pattern('100', None)])
+
+
+class PatternFlyweightTest(ALintTestCase):
+    def test_shared(self):
+        pattern_a = Pattern('_x.', 'where-a')
+        pattern_b = Pattern('_x.', 'where-b')
+        self.assertIsNot(pattern_a, pattern_b)
+        self.assertIs(pattern_a.values, pattern_b.values)
+        self.assertEqual(pattern_a.where, 'where-a')
+        self.assertEqual(pattern_b.where, 'where-b')
+
+        self.assertEqual(pattern_a.canonical_pattern, '_X.')
+        self.assertFalse(pattern_a.is_canonical)
+        self.assertIs(pattern_a._shared, pattern_b._shared)
+        self.assertIs(Pattern.shared_patterns['_x.'], pattern_a._shared)
+        self.assertEqual(
+            Pattern.shared_patterns['_x.'].canonical_pattern, '_X.')
+        self.assertFalse(pattern_b.is_canonical)
+
+    def test_not_shared(self):
+        # Equal values, but a different raw pattern.
+        pattern_a = Pattern('_X.', None)
+        pattern_b = Pattern('_x.', None)
+        self.assertEqual(pattern_a, pattern_b)
+        self.assertTrue(pattern_a.is_canonical)
+        self.assertFalse(pattern_b.is_canonical)
+
+    def test_released(self):
+        # The shared part goes away with the last pattern using it.
+        pattern = Pattern('_[1-5]XX!', None)
+        self.assertIn('_[1-5]XX!', Pattern.shared_patterns)
+        del pattern
+        gc.collect()  # (for Python implementations without refcounting)
+        self.assertNotIn('_[1-5]XX!', Pattern.shared_patterns)
+
+
+class PatternMatchTest(ALintTestCase):
+    def test_matches_extension(self):
+        matches = (
+            ('100', '100', True),
+            ('100', '1-0-0', True),
+            ('100', '1000', False),
+            ('_1XX', '100', True),
+            ('_1XX', '10', False),
+            ('_1XX', '1000', True),     # sic, Asterisk does this too
+            ('_1X.', '10', False),
+            ('_1X.', '100', True),
+            ('_1X!', '10', True),
+            ('_[13-5]!', '4', True),
+            ('_[13-5]!', '2', False),
+            ('_[0-59]X', '91', True),
+            ('_[0-59]X', '81', False),
+            ('_s-[1259]', 's5', True),
+            ('_s-[1259]', 's-3', False),
+        )
+        for pattern, extension, expected in matches:
+            self.assertEqual(
+                Pattern(pattern, None).matches_extension(extension),
+                expected, (pattern, extension))
+
+    def test_match_many(self):
+        pattern = Pattern('_0031[1-9]XXXXXXXX', None)
+        self.assertEqual(
+            pattern.match_many(
+                ['0031201234567', '0032201234567', '003120123456',
+                 '0031-20-1234567', '0031001234567']),
+            [True, False, False, True, False])
+        self.assertEqual(pattern.match_many(iter([])), [])
@@ -14,7 +14,7 @@
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 from asterisklint.alinttest import ALintTestCase
-from asterisklint.varfun import VarLoader
+from asterisklint.varfun import VarLoader, VarParseError
 from asterisklint.variable import Var
 from asterisklint.where import DUMMY_WHERE
 
@@ -64,3 +64,108 @@ class NormalTest(ALintTestCase):
             str(var), '${${a}a${c}}')
         self.assertEqual(
             var.format(a='b', c='r', bar='DEF'), 'DEF')
+
+    def test_unrelated_brackets(self):
+        # Only brackets of the variable's own kind are counted.
+        var = VarLoader().parse_variables('${a{b}[}x]', DUMMY_WHERE)
+        self.assertEqual(
+            var, Var.join([Var('a{b}['), 'x]']))
+        var = VarLoader().parse_variables('$[{${a}]}]', DUMMY_WHERE)
+        self.assertEqual(
+            str(var), '$[{${a}]}]')
+        self.assertLinted({'E_VAR_BAD_TOKENS': 1})  # 'a{b}['
+
+    def test_missing_end(self):
+        for data, endbracket in (
+                ('${foo', '}'), ('x${${foo}', '}'), ('$[${foo}', ']'),
+                # The inner $[ ends outside of the ${.
+                ('${a$[b}]', ']')):
+            with self.assertRaises(VarParseError) as context:
+                VarLoader().parse_variables(data, DUMMY_WHERE)
+            self.assertEqual(
+                str(context.exception),
+                'Error in extension logic (missing {!r})'.format(
+                    endbracket))
+
+
+class CouldMatchTest(ALintTestCase):
+    def parse(self, data):
+        return VarLoader().parse_variables(data, DUMMY_WHERE)
+
+    def test_plain_variable(self):
+        self.assertTrue(self.parse('${foo}').could_match('anything'))
+
+    def test_examples(self):
+        self.assertTrue(self.parse('${number}23').could_match('123'))
+        self.assertFalse(
+            self.parse('${user}@${domain}').could_match('somelabel'))
+        self.assertTrue(self.parse('${user}@${domain}').could_match('a@b'))
+
+    def test_prefix(self):
+        var = self.parse('label-${PRIO}')
+        self.assertTrue(var.could_match('label-'))
+        self.assertTrue(var.could_match('label-1'))
+        self.assertFalse(var.could_match('label'))
+        self.assertFalse(var.could_match('x-label-1'))
+        # Like the regex: no newline in the variable, but one at the end
+        # is fine.
+        self.assertFalse(var.could_match('label-\n1'))
+        self.assertTrue(var.could_match('label-1\n'))
+
+    def test_number(self):
+        var = self.parse('1${X}')
+        self.assertTrue(var.could_match(1))
+        self.assertTrue(var.could_match(12))
+        self.assertFalse(var.could_match(2))
+
+    def test_regex_characters(self):
+        var = self.parse('a.*${X}b+$[1]')
+        self.assertTrue(var.could_match('a.*xyzb+2'))
+        self.assertFalse(var.could_match('abbb2'))
+
+    def test_nested_join(self):
+        var = Var.join(['a', self.parse('${X}b${Y}')])
+        var = Var.join(['x', var])  # joins, but does not flatten
+        self.assertTrue(var.could_match('xa1b2'))
+        self.assertFalse(var.could_match('xa12'))
+
+
+class SegmentsTest(ALintTestCase):
+    def parse(self, data):
+        return VarLoader().parse_variables(data, DUMMY_WHERE)
+
+    def test_segments(self):
+        var = self.parse('ab${X}${Y}cd')
+        self.assertEqual(
+            [str(i) for i in var.get_segments()],
+            ['ab', '${X}', '${Y}', 'cd'])
+        self.assertEqual(self.parse('${X}').get_segments(), [var[2]])
+
+    def test_nested_join(self):
+        var = Var.join(['a', self.parse('b${X}c')])
+        var = Var.join([var, 'd', Var.join(['', 'e'])])
+        self.assertEqual(
+            [str(i) for i in var.get_segments()], ['ab', '${X}', 'cde'])
+
+    def test_iter_and_len(self):
+        var = self.parse('ab${X}c')
+        self.assertEqual([str(i) for i in var], ['a', 'b', '${X}', 'c'])
+        self.assertEqual(len(var), 4)
+        self.assertEqual(len(self.parse('${X}')), 1)
+
+    def test_getitem(self):
+        var = self.parse('ab${X}cd${Y}')
+        self.assertEqual(var[1], 'b')
+        self.assertEqual(str(var[2]), '${X}')
+        self.assertEqual(var[-3], 'c')
+        self.assertRaises(IndexError, var.__getitem__, 6)
+        self.assertRaises(IndexError, var.__getitem__, -7)
+        self.assertEqual(var[3:5], 'cd')
+        self.assertEqual([str(i) for i in var[1:4]], ['b', '${X}', 'c'])
+        self.assertEqual([str(i) for i in var[::2]], ['a', '${X}', 'd'])
+        self.assertEqual(var[4:4], [])
+
+    def test_strip_split_empty_name(self):
+        var = self.parse('${}')
+        self.assertIs(var.strip(), var)
+        self.assertEqual(var.split(':'), [''])
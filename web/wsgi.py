@@ -7,6 +7,7 @@ from wsgiref.simple_server import WSGIRequestHandler, make_server
 from asterisklint import FileDialplanParser
 from asterisklint.alintver import version_str
 from asterisklint.defines import MessageDefManager
+from asterisklint.session import LintSession
 
 
 class HttpNotImplementedError(falcon.HTTPBadRequest):
@@ -35,16 +36,6 @@ class UploadedFileOpener:
         return NamedBytesIO(self.name, self.data)
 
 
-def collect_messages():
-    ret = []
-    for msgtype, msgs in MessageDefManager.raised.items():
-        ret.extend(msgs)
-    ret.sort(key=(lambda x: (
-        x.where.filename, x.where.lineno, type(x).__name__)))
-    MessageDefManager.reset()  # very thread-unsafe, this!
-    return ret
-
-
 def max_body(limit):
     def hook(req, resp, resource, params):
         length = req.content_length
@@ -122,15 +113,15 @@ class DialplanCheck:
         filedata = req.media['files'][filename].encode('utf-8')
         opener = UploadedFileOpener(filename, filedata)
 
-        parser = FileDialplanParser(opener=opener)
-        parser.include(filename)
-        dialplan = next(iter(parser))
-        dialplan.walk_jump_destinations()
-        del dialplan
+        with LintSession() as session:  # still thread-unsafe, this!
+            parser = FileDialplanParser(opener=opener)
+            parser.include(filename)
+            dialplan = next(iter(parser))
+            dialplan.walk_jump_destinations()
+            del dialplan
 
         issues = {filename: []}
-        msgs = collect_messages()
-        for msg in msgs:
+        for msg in session.messages:
             formatted = msg.message.format(**msg.fmtkwargs)
             issues[msg.where.filename].append({
                 'line': msg.where.lineno,
@@ -145,6 +136,7 @@ class DialplanCheck:
 
 
 MessageDefManager.muted = True  # no messages to stderr
+LintSession.preload()  # before the wsgi daemon forks
 
 middleware = [EnvironmentCheckMiddleware()]
 